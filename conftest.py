@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def temp_files():
+    """То же, что core.runner.TempFilesRunner для manage.py test."""
+    from core.runner import TempFiles
+
+    temp_files = TempFiles()
+    temp_files.enable()
+    yield
+    temp_files.disable()
@@ -0,0 +1,126 @@
+"""Структурированный access log в формате JSON lines.
+
+Middleware пишет строку на каждый запрос в логгер core.accesslog, а
+AsyncBatchHandler только кладёт её в ограниченную очередь: на диск пишет
+фоновый поток, пачкой всё, что накопилось. Если диск не успевает и
+очередь полна, запись выбрасывается и считается в dropped и в метрике
+yatube_access_log_dropped_total, но запрос не ждёт.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.utils.functional import empty
+
+from core.metrics import current_request, inc
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBatchHandler(logging.Handler):
+    def __init__(self, filename, queue_size=10000, batch_size=500):
+        super().__init__()
+        self.filename = filename
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        self.queue = queue.Queue(self.queue_size)
+        self.thread = threading.Thread(
+            target=self.run, name='access-log-writer', daemon=True
+        )
+        self.thread.start()
+        self.pid = os.getpid()
+
+    def emit(self, record):
+        # После fork потока-писателя в дочернем процессе нет.
+        if self.pid != os.getpid():
+            with self.start_lock:
+                if self.pid != os.getpid():
+                    self.start()
+        try:
+            self.queue.put_nowait(self.format(record))
+        except queue.Full:
+            self.dropped += 1
+            inc('yatube_access_log_dropped_total', ())
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def write(self, lines):
+        # Файл открывается на каждую пачку, поэтому logrotate может его
+        # переименовать в любой момент.
+        try:
+            with open(self.filename, 'a', encoding='utf-8') as file:
+                file.write('\n'.join(lines) + '\n')
+        except OSError:
+            self.dropped += len(lines)
+
+    def flush(self, timeout=5):
+        """Ждёт, пока очередь запишется, но не дольше timeout секунд."""
+        if self.pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+def loaded_user_id(request):
+    """id пользователя, только если view его уже загрузил.
+
+    Ради строки в логе лишних запросов к сессии и базе не делаем.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or getattr(user, '_wrapped', None) is empty:
+        return None
+    return user.pk
+
+
+class AccessLogMiddleware:
+    """Стоит сразу после MetricsMiddleware и берёт у него SQL и кэш."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+        current = current_request()
+        match = request.resolver_match
+        entry = {
+            'time': datetime.now(timezone.utc).isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'user_id': loaded_user_id(request),
+        }
+        if current is not None:
+            entry.update({
+                'db_queries': current.queries,
+                'db_time_ms': round(current.query_time * 1000, 3),
+                'cache_hits': current.cache_hits,
+                'cache_misses': current.cache_misses,
+            })
+        logger.info(json.dumps(entry, ensure_ascii=False))
+        return response
@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.notifications import unread_count
+
+
+def unread_notifications(request):
+    """Число непрочитанных уведомлений; запрос - только если его выводят."""
+    user = getattr(request, 'user', None)
+    return {
+        'unread_notifications': SimpleLazyObject(
+            lambda: unread_count(user)
+            if user is not None and user.is_authenticated else 0
+        ),
+    }
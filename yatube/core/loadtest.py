@@ -0,0 +1,199 @@
+"""Клиентская часть нагрузочного теста для команды loadtest.
+
+Модуль не импортирует Django: функции запускаются в процессах-воркерах
+и общаются с приложением только по HTTP.
+"""
+import json
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import requests
+from PIL import Image
+
+from posts.seeding import SEED_PASSWORD
+
+ACCESS_LOG_RE = re.compile(
+    r'"(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})'
+)
+DEFAULT_MIX = 'browse=70,login=5,follow=10,comment=10,post=5'
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class VirtualUser:
+    """Клиент с собственной сессией, выполняющий сценарии нагрузки."""
+
+    def __init__(self, base_url, targets, rng):
+        self.base_url = base_url
+        self.targets = targets
+        self.rng = rng
+        self.session = requests.Session()
+        self.logged_in = False
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.session.request(method, self.base_url + path, **kwargs)
+
+    def post_form(self, path, data, **kwargs):
+        if 'csrftoken' not in self.session.cookies:
+            self.request('GET', '/auth/login/')
+        data = dict(data, csrfmiddlewaretoken=self.session.cookies.get(
+            'csrftoken', ''
+        ))
+        return self.request(
+            'POST', path, data=data,
+            headers={'Referer': self.base_url + path}, **kwargs
+        )
+
+    def ensure_login(self):
+        if not self.logged_in:
+            self.login()
+
+    def login(self):
+        self.session.cookies.clear()
+        response = self.post_form('/auth/login/', {
+            'username': self.rng.choice(self.targets['usernames']),
+            'password': SEED_PASSWORD,
+        })
+        self.logged_in = response.status_code == 302
+        return response
+
+    def browse(self):
+        pages = ['/', f'/?page={self.rng.randint(2, 20)}']
+        if self.targets['groups']:
+            pages.append(f'/group/{self.rng.choice(self.targets["groups"])}/')
+        pages.append(f'/profile/{self.rng.choice(self.targets["usernames"])}/')
+        pages.append(f'/posts/{self.rng.choice(self.targets["posts"])}/')
+        return self.request('GET', self.rng.choice(pages))
+
+    def follow(self):
+        self.ensure_login()
+        author = self.rng.choice(self.targets['usernames'])
+        self.request('GET', f'/profile/{author}/follow/')
+        return self.request('GET', '/follow/')
+
+    def comment(self):
+        self.ensure_login()
+        post = self.rng.choice(self.targets['posts'])
+        return self.post_form(
+            f'/posts/{post}/comment/',
+            {'text': f'Комментарий нагрузочного теста {self.rng.random()}'},
+        )
+
+    def post(self):
+        self.ensure_login()
+        # Шум, чтобы картинки не совпадали и не склеивались в хранилище.
+        image = Image.frombytes(
+            'L', (32, 32), bytes(self.rng.getrandbits(8) for _ in range(1024))
+        )
+        buffer = BytesIO()
+        image.save(buffer, 'PNG')
+        return self.post_form(
+            '/create/',
+            {'text': f'Пост нагрузочного теста {self.rng.random()}'},
+            files={'image': ('load.png', buffer.getvalue(), 'image/png')},
+        )
+
+
+def parse_mix(mix):
+    scenarios = {}
+    for item in mix.split(','):
+        name, weight = item.split('=')
+        if not hasattr(VirtualUser, name):
+            raise ValueError(f'Неизвестный сценарий {name}')
+        scenarios[name] = float(weight)
+    return scenarios
+
+
+def run_thread(base_url, targets, mix, deadline, seed, replay):
+    """Гоняет один виртуальный клиент до deadline.
+
+    Возвращает список (сценарий, задержка в мс, статус или None при
+    сетевой ошибке).
+    """
+    rng = random.Random(seed)
+    user = VirtualUser(base_url, targets, rng)
+    names, weights = zip(*mix.items()) if mix else ((), ())
+    samples = []
+    position = 0
+    while time.monotonic() < deadline:
+        if replay is not None:
+            if position >= len(replay):
+                break
+            name = 'replay'
+            action = (lambda path=replay[position]: user.request('GET', path))
+            position += 1
+        else:
+            name = rng.choices(names, weights)[0]
+            action = getattr(user, name)
+        started = time.perf_counter()
+        try:
+            status = action().status_code
+        except requests.RequestException:
+            status = None
+        samples.append((name, (time.perf_counter() - started) * 1000, status))
+    return samples
+
+
+def run_process(config):
+    """Один процесс нагрузки со своим пулом потоков."""
+    threads = config['threads']
+    replay = config['replay']
+    with ThreadPoolExecutor(threads) as executor:
+        futures = [
+            executor.submit(
+                run_thread,
+                config['base_url'],
+                config['targets'],
+                config['mix'],
+                config['deadline'],
+                config['seed'] * 1000 + index,
+                replay[index::threads] if replay is not None else None,
+            )
+            for index in range(threads)
+        ]
+        return [sample for future in futures for sample in future.result()]
+
+
+def parse_access_log_line(line):
+    """(метод, путь) из строки common/combined или JSON lines
+    (core.accesslog); None, если строка не разобрана."""
+    if line.lstrip().startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if isinstance(record, dict) and {'method', 'path'} <= record.keys():
+            return record['method'], record['path']
+        return None
+    match = ACCESS_LOG_RE.search(line)
+    if match:
+        return match.group('method'), match.group('path')
+    return None
+
+
+def read_access_log(path):
+    """Пути GET-запросов из access log.
+
+    Понимает формат common/combined (nginx, Apache) и JSON lines, который
+    пишет core.accesslog.
+    """
+    paths = []
+    with open(path) as log:
+        for line in log:
+            request = parse_access_log_line(line)
+            if request and request[0] == 'GET':
+                paths.append(request[1])
+    return paths
@@ -0,0 +1,215 @@
+import json
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.stats import percentile
+from posts.models import Follow, Group, Post, User
+
+
+def pick_targets():
+    """Самые тяжёлые объекты текущего набора данных."""
+    author = User.objects.annotate(
+        posts_count=Count('posts')
+    ).order_by('-posts_count').first()
+    return {
+        'group': Group.objects.annotate(
+            posts_count=Count('group_posts')
+        ).order_by('-posts_count').first(),
+        'author': author,
+        'post': Post.objects.annotate(
+            comments_count=Count('comments')
+        ).order_by('-comments_count').first(),
+        # На себя подписаться нельзя, и follow мерил бы пустой запрос.
+        'reader': User.objects.exclude(pk=author.pk).annotate(
+            follows_count=Count('follower')
+        ).order_by('-follows_count').first(),
+    }
+
+
+def benchmark_cases(targets):
+    """(имя, метод, url, данные, подготовка) для каждого измеряемого view.
+
+    Подготовка вызывается перед каждой попыткой и в замер не входит: так
+    follow и unfollow каждый раз начинают с одного и того же состояния.
+    """
+    group, author, post = targets['group'], targets['author'], targets['post']
+    pair = {'user': targets['reader'], 'author': author}
+
+    def unfollow():
+        Follow.objects.filter(**pair).delete()
+
+    def follow():
+        Follow.objects.get_or_create(**pair)
+
+    return [
+        ('index', 'get', reverse('posts:index'), None, None),
+        ('index_page_2', 'get', reverse('posts:index') + '?page=2', None,
+         None),
+        ('group_posts', 'get',
+         reverse('posts:group_list', args=(group.slug,)), None, None),
+        ('profile', 'get',
+         reverse('posts:profile', args=(author.username,)), None, None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', args=(post.pk,)), None, None),
+        ('follow_index', 'get', reverse('posts:follow_index'), None, None),
+        ('post_create', 'post', reverse('posts:post_create'),
+         {'text': 'Пост из бенчмарка'}, None),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', args=(post.pk,)),
+         {'text': 'Комментарий из бенчмарка'}, None),
+        ('profile_follow', 'get',
+         reverse('posts:profile_follow', args=(author.username,)), None,
+         unfollow),
+        ('profile_unfollow', 'get',
+         reverse('posts:profile_unfollow', args=(author.username,)), None,
+         follow),
+    ]
+
+
+def measure(client, method, url, data, repeat, warmup, setup=None):
+    """Время, запросы и размер ответа по repeat попыткам после warmup.
+
+    queries - максимум по попыткам, queries_min - минимум: если они
+    расходятся, число запросов зависит от состояния и его стоит проверить.
+    """
+    timings = []
+    queries = []
+    size = 0
+    for attempt in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        # Кэш страницы index иначе мерил бы только попадания в кэш.
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise CommandError(f'{url}: статус {response.status_code}')
+        if attempt >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(context.captured_queries))
+            size = len(response.content)
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'queries': max(queries),
+        'queries_min': min(queries),
+        'bytes': size,
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """Сравнивает p95 и число запросов с эталоном."""
+    regressions = []
+    for dataset, views in results.items():
+        for view, current in views.items():
+            previous = baseline.get(dataset, {}).get(view)
+            if previous is None:
+                continue
+            if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+                regressions.append(
+                    f'{view} на {dataset} постах: p95 '
+                    f'{previous["p95_ms"]} -> {current["p95_ms"]} мс'
+                )
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f'{view} на {dataset} постах: запросов '
+                    f'{previous["queries"]} -> {current["queries"]}'
+                )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет время ответа, число SQL-запросов и размер страницы для '
+        'основных view на наборах данных нескольких размеров. Данные '
+        'создаются командой seed во временной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,10000',
+            help='Число постов в наборах данных через запятую.',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Куда записать результаты в JSON.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона, с которым сравнить результаты.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 относительно эталона (0.2 = 20%%).',
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            results = self.run_benchmarks(sizes, options)
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = find_regressions(
+                    results, json.load(baseline), options['threshold']
+                )
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write('Регрессий нет')
+
+    def run_benchmarks(self, sizes, options):
+        results = {}
+        for size in sizes:
+            self.grow_dataset(size, options['seed'])
+            targets = pick_targets()
+            client = Client()
+            client.force_login(targets['reader'])
+            views = results[str(size)] = {}
+            cases = benchmark_cases(targets)
+            for name, method, url, data, setup in cases:
+                views[name] = measure(
+                    client, method, url, data,
+                    options['repeat'], options['warmup'], setup,
+                )
+                self.stdout.write(f'{size:>8} {name:<18} {views[name]}')
+        return results
+
+    def grow_dataset(self, size, seed):
+        """Досоздаёт данные до size постов, сохраняя прежние."""
+        missing = size - Post.objects.count()
+        if missing <= 0:
+            return
+        call_command(
+            'seed',
+            users=max(missing // 10, 10),
+            groups=max(missing // 500, 1),
+            posts=missing,
+            comments=missing * 2,
+            seed=seed + size,
+            stdout=self.stdout,
+        )
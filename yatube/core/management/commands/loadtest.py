@@ -0,0 +1,180 @@
+import multiprocessing
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from wsgiref.simple_server import make_server
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import OperationalError
+
+from core.loadtest import (
+    DEFAULT_MIX,
+    QuietHandler,
+    ThreadingWSGIServer,
+    parse_mix,
+    read_access_log,
+    run_process,
+)
+from core.stats import percentile
+from posts.models import Group, Post, User
+
+SAMPLE_SIZE: int = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: много потоков и процессов ходят в приложение '
+        'по взвешенной смеси сценариев или по записанному access log. '
+        'Без --url поднимает yatube.wsgi.application на локальном '
+        'многопоточном сервере. Сценарии с входом рассчитаны на '
+        'пользователей, созданных командой seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', help='Адрес уже запущенного сервера.'
+        )
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность теста в секундах.',
+        )
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help='Веса сценариев browse, login, follow, comment, post.',
+        )
+        parser.add_argument(
+            '--access-log',
+            help='Повторить GET-запросы из access log вместо смеси.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        targets = {
+            'usernames': list(
+                User.objects.values_list('username', flat=True)[:SAMPLE_SIZE]
+            ),
+            'groups': list(
+                Group.objects.values_list('slug', flat=True)[:SAMPLE_SIZE]
+            ),
+            'posts': list(
+                Post.objects.values_list('pk', flat=True)[:SAMPLE_SIZE]
+            ),
+        }
+        if not targets['usernames'] or not targets['posts']:
+            raise CommandError('База пуста, сначала запустите seed')
+        if settings.DEBUG and options['url'] is None:
+            self.stderr.write(
+                'DEBUG включён: debug toolbar и запись SQL-запросов '
+                'сильно замедляют ответы, цифры будут занижены'
+            )
+        replay = None
+        if options['access_log']:
+            replay = read_access_log(options['access_log'])
+            if not replay:
+                raise CommandError(
+                    'В access log не найдено ни одного GET-запроса'
+                )
+
+        server = None
+        base_url = options['url']
+        exceptions = Counter()
+        if base_url is None:
+            server, base_url = self.start_server(options['port'], exceptions)
+        try:
+            started = time.monotonic()
+            samples = self.run_load(base_url, targets, replay, options)
+            elapsed = time.monotonic() - started
+        finally:
+            if server is not None:
+                server.shutdown()
+        self.report(samples, elapsed, exceptions, server is not None)
+
+    def start_server(self, port, exceptions):
+        from yatube.wsgi import application
+
+        def count_exception(sender, **kwargs):
+            error = sys.exc_info()[1]
+            kind = 'другие'
+            if isinstance(error, OperationalError):
+                kind = 'блокировки БД' if 'locked' in str(error) else 'БД'
+            exceptions[kind] += 1
+
+        got_request_exception.connect(count_exception, weak=False)
+        server = make_server(
+            '127.0.0.1', port, application,
+            server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f'http://127.0.0.1:{port}'
+
+    def run_load(self, base_url, targets, replay, options):
+        processes = max(options['processes'], 1)
+        mix = {}
+        if replay is None:
+            try:
+                mix = parse_mix(options['mix'])
+            except ValueError as error:
+                raise CommandError(error)
+        configs = [
+            {
+                'base_url': base_url.rstrip('/'),
+                'targets': targets,
+                'mix': mix,
+                'deadline': time.monotonic() + options['duration'],
+                'seed': options['seed'] * 100 + index,
+                'threads': options['threads'],
+                'replay': (
+                    replay[index::processes] if replay is not None else None
+                ),
+            }
+            for index in range(processes)
+        ]
+        if processes == 1:
+            return run_process(configs[0])
+        # time.monotonic общий для процессов одной машины.
+        with multiprocessing.Pool(processes) as pool:
+            return [
+                sample
+                for samples in pool.map(run_process, configs)
+                for sample in samples
+            ]
+
+    def report(self, samples, elapsed, exceptions, local):
+        if not samples:
+            raise CommandError('Ни одного запроса не выполнено')
+        by_scenario = defaultdict(list)
+        statuses = Counter()
+        for name, latency, status in samples:
+            by_scenario[name].append(latency)
+            statuses[status] += 1
+        errors = sum(
+            count for status, count in statuses.items()
+            if status is None or status >= 500
+        )
+        self.stdout.write(
+            f'Запросов: {len(samples)} за {elapsed:.1f} с, '
+            f'{len(samples) / elapsed:.1f} запросов/с'
+        )
+        self.stdout.write(
+            f'Ошибок: {errors} ({errors / len(samples):.2%}), '
+            f'статусы: {dict(statuses)}'
+        )
+        if local:
+            self.stdout.write(f'Исключения в приложении: {dict(exceptions)}')
+        self.stdout.write(
+            f'{"сценарий":<10} {"запросов":>9} {"p50":>9} {"p95":>9} '
+            f'{"p99":>9}'
+        )
+        for name, latencies in sorted(by_scenario.items()):
+            self.stdout.write(
+                f'{name:<10} {len(latencies):>9} '
+                + ' '.join(
+                    f'{percentile(latencies, q):>7.1f}мс' for q in (50, 95, 99)
+                )
+            )
@@ -0,0 +1,69 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.management.commands.slow_queries import read_log
+from core.stats import percentile
+
+
+def aggregate(entries):
+    """Пики, остаток памяти и главные места выделения по view."""
+    views = defaultdict(lambda: {
+        'peaks': [], 'retained': [], 'sites': Counter(),
+    })
+    for entry in entries:
+        view = views[entry.get('view') or '-']
+        # До Python 3.9 пик не всегда можно измерить, тогда он None.
+        if entry['peak_bytes'] is not None:
+            view['peaks'].append(entry['peak_bytes'])
+        view['retained'].append(entry['retained_bytes'])
+        for site in entry['top']:
+            view['sites'][f'{site["file"]}:{site["line"]}'] += (
+                site['size_diff']
+            )
+    return [
+        {
+            'view': name,
+            'requests': len(data['retained']),
+            'peak_p50': percentile(data['peaks'], 50) if data['peaks'] else 0,
+            'peak_max': max(data['peaks'], default=0),
+            'retained_mean': sum(data['retained']) / len(data['retained']),
+            'sites': data['sites'].most_common(5),
+        }
+        for name, data in views.items()
+    ]
+
+
+def kib(size):
+    return f'{size / 1024:.1f} КиБ'
+
+
+class Command(BaseCommand):
+    help = (
+        'Отчёт по замерам памяти запросов: view с наибольшим пиком памяти '
+        'и строки кода, которые больше всего выделяют. Стабильно '
+        'положительный остаток после запроса похож на утечку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=None,
+            help='Файл журнала; по умолчанию MEMORY_PROFILE_LOG.',
+        )
+        parser.add_argument('--top', type=int, default=20)
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.MEMORY_PROFILE_LOG
+        report = aggregate(read_log(path))
+        if not report:
+            raise CommandError(f'В {path} нет замеров')
+        report.sort(key=lambda row: row['peak_max'], reverse=True)
+        for row in report[:options['top']]:
+            self.stdout.write(
+                f'{row["view"]}: замеров {row["requests"]}, пик p50 '
+                f'{kib(row["peak_p50"])}, максимум {kib(row["peak_max"])}, '
+                f'остаётся в среднем {kib(row["retained_mean"])}'
+            )
+            for site, size in row['sites']:
+                self.stdout.write(f'   {kib(size):>12} {site}')
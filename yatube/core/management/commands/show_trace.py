@@ -0,0 +1,89 @@
+import glob
+import json
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BAR_WIDTH: int = 40
+
+
+def read_spans(directory, trace_id=None):
+    """Спаны одной трассы; без trace_id - последней записанной."""
+    spans = []
+    for name in glob.glob(os.path.join(directory, '*.jsonl')):
+        with open(name, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if trace_id is None or record['trace_id'] == trace_id:
+                    spans.append(record)
+    if trace_id is None and spans:
+        latest = max(
+            (record for record in spans if record['parent_id'] is None),
+            key=lambda record: record['start_ns'],
+            default=None,
+        )
+        if latest is None:
+            return []
+        spans = [
+            record for record in spans
+            if record['trace_id'] == latest['trace_id']
+        ]
+    return spans
+
+
+def waterfall(spans):
+    """Строки водопада: отступ по вложенности, полоса по времени."""
+    children = defaultdict(list)
+    for record in spans:
+        children[record['parent_id']].append(record)
+    roots = children[None]
+    if not roots:
+        return []
+    root = roots[0]
+    begin = root['start_ns']
+    total = max(root['duration_ns'], 1)
+    lines = []
+
+    def walk(record, depth):
+        offset = (record['start_ns'] - begin) / total
+        width = max(round(record['duration_ns'] / total * BAR_WIDTH), 1)
+        bar = (' ' * round(offset * BAR_WIDTH) + '#' * width).ljust(BAR_WIDTH)
+        details = ' '.join(
+            f'{key}={value}' for key, value in record['attributes'].items()
+        )
+        lines.append(
+            f'{bar[:BAR_WIDTH]} {record["duration_ns"] / 1e6:8.2f} мс '
+            f'{"  " * depth}{record["name"]} {details}'.rstrip()
+        )
+        for child in sorted(
+            children[record['span_id']], key=lambda item: item['start_ns']
+        ):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return lines
+
+
+class Command(BaseCommand):
+    help = (
+        'Водопад спанов одного запроса из TRACING_DIR: view, SQL, шаблоны, '
+        'кэш и миниатюры. Trace id приходит в заголовке X-Trace-ID.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'trace_id', nargs='?',
+            help='Какую трассу показать; по умолчанию последнюю.',
+        )
+
+    def handle(self, *args, **options):
+        spans = read_spans(settings.TRACING_DIR, options['trace_id'])
+        if not spans:
+            raise CommandError('Трасса не найдена')
+        for line in waterfall(spans):
+            self.stdout.write(line)
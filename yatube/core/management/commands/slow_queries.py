@@ -0,0 +1,82 @@
+import glob
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.stats import percentile
+
+ORDERINGS = ('total', 'count', 'max', 'p95')
+
+
+def read_log(path):
+    """Записи журнала вместе с ротированными файлами path.1, path.2..."""
+    for name in sorted(glob.glob(glob.escape(path) + '*')):
+        with open(name, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def aggregate(entries):
+    """Статистика по формам запросов."""
+    shapes = defaultdict(lambda: {
+        'durations': [], 'views': Counter(), 'stacks': Counter(),
+    })
+    for entry in entries:
+        shape = shapes[entry['shape']]
+        shape['durations'].append(entry['duration_ms'])
+        shape['views'][entry.get('view') or '-'] += 1
+        shape['stacks'][' <- '.join(entry.get('stack') or ['-'])] += 1
+    return [
+        {
+            'shape': sql,
+            'count': len(data['durations']),
+            'total': sum(data['durations']),
+            'max': max(data['durations']),
+            'p95': percentile(data['durations'], 95),
+            'views': data['views'].most_common(3),
+            'stack': data['stacks'].most_common(1)[0][0],
+        }
+        for sql, data in shapes.items()
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Отчёт по журналу медленных SQL-запросов: формы запросов, '
+        'отсортированные по суммарному времени, с view и стеком, откуда '
+        'они чаще всего вызываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=None,
+            help='Файл журнала; по умолчанию SLOW_QUERY_LOG.',
+        )
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--order-by', choices=ORDERINGS, default='total',
+            help='По чему ранжировать формы запросов.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.SLOW_QUERY_LOG
+        report = aggregate(read_log(path))
+        if not report:
+            raise CommandError(f'В {path} нет медленных запросов')
+        report.sort(key=lambda row: row[options['order_by']], reverse=True)
+        for place, row in enumerate(report[:options['top']], 1):
+            self.stdout.write(
+                f'{place}. всего {row["total"]:.1f} мс, запросов '
+                f'{row["count"]}, p95 {row["p95"]:.1f} мс, '
+                f'максимум {row["max"]:.1f} мс'
+            )
+            self.stdout.write(f'   {row["shape"]}')
+            self.stdout.write('   view: ' + ', '.join(
+                f'{view} ({count})' for view, count in row['views']
+            ))
+            self.stdout.write(f'   стек: {row["stack"]}')
@@ -0,0 +1,172 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+from posts.storage import HASHED_NAME_RE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+SENDFILE_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',
+    'x-sendfile': 'X-Sendfile',
+}
+# SVG может содержать скрипты, поэтому отдаётся как прочие файлы.
+ACTIVE_IMAGE_TYPES = {'image/svg+xml'}
+
+
+class FileRange:
+    """Файл, из которого можно прочитать только length байт с позиции start.
+
+    Нарочно без fileno(): иначе WSGI-сервер может отдать через sendfile
+    весь хвост файла, а не запрошенный диапазон.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def make_etag(name, stat):
+    """Сильный ETag: хэш содержимого для content-addressed файлов,
+    иначе время изменения и размер."""
+    match = HASHED_NAME_RE.search(name)
+    if match:
+        return '"%s"' % match.group('digest')
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def media_content_type(full_path):
+    """Content-Type и Content-Disposition для файла.
+
+    Картинки показываются в браузере, всё остальное только скачивается:
+    иначе загруженный HTML исполнится на нашем домене.
+    """
+    content_type = mimetypes.guess_type(full_path)[0]
+    if (
+        content_type
+        and content_type.startswith('image/')
+        and content_type not in ACTIVE_IMAGE_TYPES
+    ):
+        return content_type, None
+    return 'application/octet-stream', 'attachment'
+
+
+def parse_range(header, size):
+    """Разбирает одиночный диапазон из заголовка Range.
+
+    Возвращает (start, length), None, если заголовок не поддерживается и
+    надо отдать файл целиком, или ValueError для невыполнимого диапазона.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдаёт файлы из MEDIA_ROOT.
+
+    Если перед приложением стоит nginx или Apache, файл отдаёт он
+    (MEDIA_SENDFILE_BACKEND), иначе файл отдаётся через FileResponse, и
+    WSGI-сервер может передать его в сокет через sendfile.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    etag = make_etag(path, stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'X-Content-Type-Options': 'nosniff',
+        'Cache-Control': (
+            IMMUTABLE_CACHE_CONTROL if HASHED_NAME_RE.search(path)
+            else REVALIDATE_CACHE_CONTROL
+        ),
+    }
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, disposition = media_content_type(full_path)
+    if disposition:
+        headers['Content-Disposition'] = disposition
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        location = full_path
+        if backend == 'x-accel-redirect':
+            location = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        response[SENDFILE_HEADERS[backend]] = location
+    else:
+        response = serve_file(request, full_path, stat, etag, content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def serve_file(request, full_path, stat, etag, content_type):
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % stat.st_size
+            return response
+    if byte_range is None:
+        return FileResponse(open(full_path, 'rb'), content_type=content_type)
+    start, length = byte_range
+    response = FileResponse(
+        FileRange(open(full_path, 'rb'), start, length),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Length'] = length
+    response['Content-Range'] = 'bytes %d-%d/%d' % (
+        start, start + length - 1, stat.st_size
+    )
+    return response
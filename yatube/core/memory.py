@@ -0,0 +1,102 @@
+"""Выборочный замер памяти запросов через tracemalloc.
+
+Для доли MEMORY_PROFILE_SAMPLE_RATE запросов снимаются снимки tracemalloc
+до и после ответа. В логгер core.memory пишется строка JSON: пик памяти
+за запрос, сколько памяти осталось занятым после него и строки кода,
+которые больше всего выделили. Отчёт по view строит команда
+memory_report.
+
+tracemalloc один на процесс, поэтому одновременно замеряется только один
+запрос, а в многопоточном сервере в замер попадают и соседние потоки.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IGNORED_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_lock = threading.Lock()
+
+
+def short_filename(filename):
+    if filename.startswith(str(settings.BASE_DIR)):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    return filename
+
+
+def top_allocations(before, after, limit):
+    """Строки кода, после которых занятой памяти стало больше всего."""
+    stats = after.filter_traces(IGNORED_FILTERS).compare_to(
+        before.filter_traces(IGNORED_FILTERS), 'lineno'
+    )
+    return [
+        {
+            'file': short_filename(stat.traceback[0].filename),
+            'line': stat.traceback[0].lineno,
+            'size_diff': stat.size_diff,
+            'count_diff': stat.count_diff,
+        }
+        for stat in stats[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+class MemoryProfileMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            random.random() >= settings.MEMORY_PROFILE_SAMPLE_RATE
+            or not _lock.acquire(blocking=False)
+        ):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            _lock.release()
+
+    def profile(self, request):
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(settings.MEMORY_PROFILE_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            # reset_peak появился в Python 3.9. Раньше пик честен, только
+            # если трассировку запустили здесь: он считается с её начала.
+            peak_known = started_here
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+                peak_known = True
+            baseline = tracemalloc.get_traced_memory()[0]
+            response = self.get_response(request)
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'time': datetime.now(timezone.utc).isoformat(),
+            'view': match.view_name if match else None,
+            'path': request.path,
+            'peak_bytes': peak - baseline if peak_known else None,
+            'retained_bytes': current - baseline,
+            'top': top_allocations(
+                before, after, settings.MEMORY_PROFILE_TOP
+            ),
+        }, ensure_ascii=False))
+        return response
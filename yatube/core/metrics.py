@@ -0,0 +1,342 @@
+"""Метрики приложения в текстовом формате Prometheus.
+
+Счётчики копятся в словаре своего потока, поэтому запись метрики не
+берёт блокировок. Раз в METRICS_FLUSH_INTERVAL секунд процесс пишет
+сумму по своим потокам в METRICS_DIR/<pid>.json, а /metrics складывает
+файлы всех процессов, так что в ответе видны все воркеры gunicorn или
+uWSGI. Файлы, не обновлявшиеся METRICS_STALE_AFTER секунд, считаются
+оставшимися от умерших процессов и не учитываются.
+"""
+import hmac
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+from django.views.decorators.http import require_safe
+
+from core.tracing import span
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+METRICS = {
+    'yatube_requests_total': ('counter', 'Число запросов.'),
+    'yatube_request_duration_seconds': ('histogram', 'Время ответа.'),
+    'yatube_response_size_bytes': ('histogram', 'Размер ответа.'),
+    'yatube_db_queries_total': ('counter', 'Число SQL-запросов.'),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Время выполнения SQL-запросов.'
+    ),
+    'yatube_template_render_seconds_total': (
+        'counter', 'Время рендеринга шаблонов.'
+    ),
+    'yatube_cache_requests_total': ('counter', 'Чтения из кэша.'),
+    'yatube_access_log_dropped_total': (
+        'counter', 'Строки access log, выброшенные из-за полной очереди.'
+    ),
+}
+MISSING = object()
+
+_local = threading.local()
+_stores = []
+_stores_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+_pid = os.getpid()
+
+
+def check_fork():
+    """После fork (gunicorn --preload) начинаем со своих пустых счётчиков.
+
+    Иначе воркеры унаследуют счётчики мастера и посчитают их каждый.
+    """
+    global _local, _stores, _last_flush, _pid
+    if _pid != os.getpid():
+        with _stores_lock:
+            if _pid != os.getpid():
+                _local = threading.local()
+                _stores = []
+                _last_flush = 0.0
+                _pid = os.getpid()
+
+
+def local_store():
+    check_fork()
+    store = getattr(_local, 'store', None)
+    if store is None:
+        store = _local.store = {}
+        with _stores_lock:
+            _stores.append(store)
+    return store
+
+
+def inc(name, labels, value=1):
+    store = local_store()
+    key = (name, labels)
+    store[key] = store.get(key, 0) + value
+
+
+def observe(name, labels, value, buckets):
+    """Гистограмма хранится как обычные счётчики _bucket, _sum, _count."""
+    for bound in buckets:
+        if value <= bound:
+            inc(name + '_bucket', labels + (('le', str(bound)),))
+    inc(name + '_bucket', labels + (('le', '+Inf'),))
+    inc(name + '_sum', labels, value)
+    inc(name + '_count', labels)
+
+
+def snapshot():
+    """Сумма счётчиков всех потоков процесса."""
+    check_fork()
+    with _stores_lock:
+        stores = list(_stores)
+    totals = {}
+    for store in stores:
+        # list(items()) выполняется целиком под GIL, поэтому чужой поток
+        # не изменит словарь посреди копирования.
+        for key, value in list(store.items()):
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def snapshot_path():
+    return os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+
+
+def flush(force=False):
+    """Пишет счётчики процесса в METRICS_DIR не чаще раза в интервал."""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    # Если файл уже пишет другой поток, обычный запрос его не ждёт.
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        _last_flush = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = snapshot_path()
+        with open(path + '.tmp', 'w') as file:
+            json.dump(
+                [[name, labels, value]
+                 for (name, labels), value in snapshot().items()],
+                file,
+            )
+        os.replace(path + '.tmp', path)
+    finally:
+        _flush_lock.release()
+
+
+def collect():
+    """Сумма счётчиков живых процессов, пишущих в METRICS_DIR."""
+    flush(force=True)
+    totals = {}
+    stale = time.time() - settings.METRICS_STALE_AFTER
+    for entry in os.scandir(settings.METRICS_DIR):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            if entry.stat().st_mtime < stale:
+                continue
+            with open(entry.path) as file:
+                rows = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in rows:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def base_name(name):
+    for suffix in HISTOGRAM_SUFFIXES:
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def sample_order(key):
+    name, labels = key
+    return base_name(name), name, tuple(
+        (label, float(value.replace('+Inf', 'inf')) if label == 'le'
+         else value)
+        for label, value in labels
+    )
+
+
+def escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def render(totals):
+    lines = []
+    described = set()
+    for key in sorted(totals, key=sample_order):
+        name, labels = key
+        metric = base_name(name)
+        if metric not in described and metric in METRICS:
+            described.add(metric)
+            kind, description = METRICS[metric]
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} {kind}')
+        label_text = ','.join(
+            f'{label}="{escape(value)}"' for label, value in labels
+        )
+        if label_text:
+            label_text = f'{{{label_text}}}'
+        lines.append(f'{name}{label_text} {totals[key]:g}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    """Метрики одного запроса; заодно execute_wrapper для SQL."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+
+def current_request():
+    return getattr(_local, 'request', None)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        check_fork()
+        current = _local.request = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(current))
+                response = self.get_response(request)
+        finally:
+            _local.request = None
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        labels = (('view', match.view_name if match else 'unresolved'),)
+        inc('yatube_requests_total', labels + (
+            ('method', request.method),
+            ('status', str(response.status_code)),
+        ))
+        observe(
+            'yatube_request_duration_seconds', labels, duration,
+            DURATION_BUCKETS,
+        )
+        if not response.streaming:
+            observe(
+                'yatube_response_size_bytes', labels, len(response.content),
+                SIZE_BUCKETS,
+            )
+        inc('yatube_db_queries_total', labels, current.queries)
+        inc('yatube_db_query_seconds_total', labels, current.query_time)
+        inc(
+            'yatube_template_render_seconds_total', labels,
+            current.template_time,
+        )
+        inc('yatube_cache_requests_total', labels + (('result', 'hit'),),
+            current.cache_hits)
+        inc('yatube_cache_requests_total', labels + (('result', 'miss'),),
+            current.cache_misses)
+        flush()
+        return response
+
+
+class MeteredTemplate(Template):
+    def render(self, context=None, request=None):
+        current = current_request()
+        if current is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            current.template_time += time.perf_counter() - started
+
+
+class MeteredDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, который засекает время рендеринга шаблонов.
+
+    Шаблоны из include и extends рендерятся внутри родительского и
+    отдельно не считаются.
+    """
+
+    def from_string(self, template_code):
+        return MeteredTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return MeteredTemplate(
+            super().get_template(template_name).template, self
+        )
+
+
+class MeteredLocMemCache(LocMemCache):
+    """LocMemCache, который считает попадания и промахи.
+
+    Заодно обращения к кэшу попадают в трассировку отдельными спанами.
+    """
+
+    def get(self, key, default=None, version=None):
+        with span('cache.get', key=key) as current_span:
+            value = super().get(key, MISSING, version)
+            if current_span is not None:
+                current_span.attributes['hit'] = value is not MISSING
+        current = current_request()
+        if current is not None:
+            if value is MISSING:
+                current.cache_misses += 1
+            else:
+                current.cache_hits += 1
+        return default if value is MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with span('cache.set', key=key):
+            return super().set(key, value, timeout, version)
+
+    def delete(self, key, version=None):
+        with span('cache.delete', key=key):
+            return super().delete(key, version)
+
+
+@require_safe
+def metrics(request):
+    """Метрики для Prometheus, только с METRICS_TOKEN.
+
+    REMOTE_ADDR не годится: за nginx все запросы приходят с 127.0.0.1.
+    """
+    token = settings.METRICS_TOKEN
+    given = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(
+        given.encode(), f'Bearer {token}'.encode()
+    ):
+        raise Http404
+    return HttpResponse(
+        render(collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
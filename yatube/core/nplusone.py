@@ -0,0 +1,123 @@
+"""Поиск N+1 запросов в живых запросах к сайту.
+
+Для выборки запросов (NPLUSONE_SAMPLE_RATE) middleware смотрит на все
+SQL-запросы через connection.execute_wrapper. Если запрос одной формы
+выполнился с разными параметрами NPLUSONE_THRESHOLD раз и больше, в лог
+пишется, какая строка шаблона или какой код проекта его вызвал.
+"""
+import logging
+import os
+import random
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+IN_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+SPACES_RE = re.compile(r'\s+')
+RENDER_ANNOTATED_CODE = Node.render_annotated.__code__
+# модули, которые сами подглядывают за запросами: их кадры не место вызова
+INSTRUMENTATION_MODULES = frozenset((
+    'core.metrics', 'core.nplusone', 'core.profiler', 'core.slowlog',
+    'core.tracing',
+))
+
+
+def query_shape(sql):
+    """SQL без параметров: списки IN любой длины считаются одинаковыми."""
+    return SPACES_RE.sub(' ', IN_LIST_RE.sub('(%s...)', sql)).strip()
+
+
+def is_project_frame(frame):
+    filename = frame.f_code.co_filename
+    return (
+        filename.startswith(str(settings.BASE_DIR))
+        and 'site-packages' not in filename
+        and frame.f_globals.get('__name__') not in INSTRUMENTATION_MODULES
+    )
+
+
+def call_site(frame):
+    """Строка шаблона и/или кода проекта, из-за которой выполнен запрос.
+
+    Стек просматривается изнутри наружу. Шаблонный узел находится по
+    кадру Node.render_annotated: у узла есть origin и номер строки.
+    """
+    code_site = None
+    while frame is not None:
+        code = frame.f_code
+        if code is RENDER_ANNOTATED_CODE:
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                site = '%s:%s' % (
+                    origin.template_name or origin.name, token.lineno
+                )
+                if code_site is not None:
+                    return '%s в шаблоне %s' % (code_site, site)
+                return site
+        elif code_site is None and is_project_frame(frame):
+            code_site = '%s:%s (%s)' % (
+                os.path.relpath(code.co_filename, settings.BASE_DIR),
+                frame.f_lineno,
+                code.co_name,
+            )
+        frame = frame.f_back
+    return code_site or 'неизвестно'
+
+
+class QueryCollector:
+    """execute_wrapper, который считает SELECT-запросы по формам."""
+
+    def __init__(self):
+        self.params = defaultdict(set)
+        self.sites = defaultdict(Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            shape = query_shape(sql)
+            seen = self.params[shape]
+            seen.add(repr(params))
+            # Стек разбираем, только когда форма уже повторилась.
+            if len(seen) > 1:
+                self.sites[shape][call_site(sys._getframe(1))] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """(форма, число разных параметров, частые места вызова)."""
+        return [
+            (shape, len(seen), [
+                site for site, _ in self.sites[shape].most_common(3)
+            ])
+            for shape, seen in self.params.items()
+            if len(seen) >= threshold
+        ]
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.NPLUSONE_SAMPLE_RATE:
+            return self.get_response(request)
+        collector = QueryCollector()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            response = self.get_response(request)
+        for shape, count, sites in collector.repeated(
+            settings.NPLUSONE_THRESHOLD
+        ):
+            logger.warning(
+                'N+1 на %s: %d запросов "%s", вызваны из %s',
+                request.path, count, shape, ', '.join(sites),
+            )
+        return response
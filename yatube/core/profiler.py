@@ -0,0 +1,177 @@
+"""Сэмплирующий профилировщик отдельных запросов.
+
+Запрос профилируется, если в заголовке X-Profile или параметре
+?profile= передан PROFILER_TOKEN, а также каждый PROFILER_SAMPLE_EVERY-й
+запрос. Раз в PROFILER_INTERVAL секунд снимается стек потока, который
+обрабатывает запрос, и в PROFILER_DIR/<request id>.folded пишутся
+свёрнутые стеки: их понимают flamegraph.pl и speedscope.
+"""
+import hmac
+import itertools
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+
+from core.nplusone import RENDER_ANNOTATED_CODE
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9-]{1,64}$')
+
+# Таймер с сигналом один на процесс, поэтому им пользуется только один
+# запрос за раз.
+_signal_lock = threading.Lock()
+
+
+def frame_label(frame, labels):
+    code = frame.f_code
+    if code is RENDER_ANNOTATED_CODE:
+        node = frame.f_locals.get('self')
+        origin = getattr(node, 'origin', None)
+        token = getattr(node, 'token', None)
+        if origin is not None and token is not None:
+            return 'шаблон %s:%s' % (
+                origin.template_name or origin.name, token.lineno
+            )
+    label = labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(str(settings.BASE_DIR)):
+            filename = os.path.relpath(filename, settings.BASE_DIR)
+        label = labels[code] = '%s (%s:%s)' % (
+            code.co_name, filename, code.co_firstlineno
+        )
+    return label
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.labels = {}
+
+    def record(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(frame_label(frame, self.labels))
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in sorted(
+                self.stacks.items()
+            )
+        )
+
+
+class SignalSampler(StackSampler):
+    """Снимает стек по SIGALRM от ITIMER_REAL.
+
+    Таймер идёт по настенным часам, поэтому видно и ожидание базы.
+    Работает только в главном потоке: там и ставится обработчик
+    сигнала, и выполняется запрос.
+    """
+
+    def start(self):
+        self.previous = signal.signal(signal.SIGALRM, self.handle)
+        signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+
+    def handle(self, signum, frame):
+        self.record(frame)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self.previous)
+        _signal_lock.release()
+
+
+class ThreadSampler(StackSampler):
+    """Снимает стек потока запроса из отдельного потока.
+
+    Для многопоточных серверов, где сигналы до потока запроса не
+    доходят.
+    """
+
+    def start(self):
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.record(frame)
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+def make_sampler(interval):
+    thread_id = threading.get_ident()
+    if (
+        threading.current_thread() is threading.main_thread()
+        and hasattr(signal, 'setitimer')
+        and _signal_lock.acquire(blocking=False)
+    ):
+        return SignalSampler(thread_id, interval)
+    return ThreadSampler(thread_id, interval)
+
+
+def request_id_of(request):
+    """X-Request-ID от балансировщика или новый идентификатор."""
+    request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+    if REQUEST_ID_RE.match(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.counter = itertools.count(1)
+
+    def authorized(self, request):
+        token = settings.PROFILER_TOKEN
+        if not token:
+            return False
+        given = request.META.get('HTTP_X_PROFILE') or request.GET.get(
+            'profile', ''
+        )
+        return hmac.compare_digest(given.encode(), token.encode())
+
+    def sampled(self):
+        every = settings.PROFILER_SAMPLE_EVERY
+        return bool(every) and next(self.counter) % every == 0
+
+    def __call__(self, request):
+        if not (self.authorized(request) or self.sampled()):
+            return self.get_response(request)
+        request_id = request_id_of(request)
+        sampler = make_sampler(settings.PROFILER_INTERVAL)
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILER_DIR, request_id + '.folded')
+        with open(path, 'w') as file:
+            file.write(sampler.collapsed())
+        logger.info(
+            'Профиль %s %s: %d сэмплов в %s',
+            request.method, request.path,
+            sum(sampler.stacks.values()), path,
+        )
+        response['X-Request-ID'] = request_id
+        return response
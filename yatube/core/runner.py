@@ -0,0 +1,60 @@
+"""Запуск тестов без мусора в BASE_DIR.
+
+Любой тестовый запрос проходит через MetricsMiddleware и
+AccessLogMiddleware, поэтому METRICS_DIR и ACCESS_LOG на время тестов
+переносятся во временный каталог.
+"""
+import logging
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from core.accesslog import AsyncBatchHandler
+
+
+class TempFiles:
+    """ACCESS_LOG и METRICS_DIR во временном каталоге.
+
+    Общая часть TempFilesRunner и фикстуры temp_files в conftest.py для
+    pytest.
+    """
+
+    def enable(self):
+        self.temp_dir = tempfile.mkdtemp()
+        access_log = os.path.join(self.temp_dir, 'access.log')
+        self.overrides = override_settings(
+            ACCESS_LOG=access_log,
+            METRICS_DIR=os.path.join(self.temp_dir, 'metrics'),
+        )
+        self.overrides.enable()
+        # Обработчик создан при настройке логирования, до override_settings,
+        # и свой файл помнит сам.
+        self.handlers = [
+            (handler, handler.filename)
+            for handler in logging.getLogger('core.accesslog').handlers
+            if isinstance(handler, AsyncBatchHandler)
+        ]
+        for handler, _ in self.handlers:
+            handler.flush()
+            handler.filename = access_log
+
+    def disable(self):
+        for handler, filename in self.handlers:
+            handler.flush()
+            handler.filename = filename
+        self.overrides.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TempFilesRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temp_files = TempFiles()
+        self.temp_files.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.temp_files.disable()
+        super().teardown_test_environment(**kwargs)
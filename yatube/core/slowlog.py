@@ -0,0 +1,102 @@
+"""Журнал медленных SQL-запросов.
+
+Обёртка ставится на каждое новое подключение к базе (сигнал
+connection_created) и пишет в логгер core.slowlog запросы дольше
+SLOW_QUERY_THRESHOLD секунд: форму запроса, типы параметров, время,
+view и последние кадры стека из кода проекта. Записи - строки JSON;
+команда slow_queries собирает из них отчёт.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from core.nplusone import is_project_frame, query_shape
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH: int = 8
+
+_local = threading.local()
+
+
+def params_shape(params, many):
+    """Типы параметров вместо значений: в журнал не попадут личные данные."""
+    if params is None:
+        return None
+    if many:
+        params = next(iter(params), ())
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def project_stack(frame, depth=STACK_DEPTH):
+    stack = []
+    while frame is not None and len(stack) < depth:
+        if is_project_frame(frame):
+            stack.append('%s:%s %s' % (
+                os.path.relpath(frame.f_code.co_filename, settings.BASE_DIR),
+                frame.f_lineno,
+                frame.f_code.co_name,
+            ))
+        frame = frame.f_back
+    return stack
+
+
+def current_view():
+    request = getattr(_local, 'request', None)
+    if request is None:
+        return None, None
+    match = request.resolver_match
+    return match.view_name if match else None, request.path
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if duration >= settings.SLOW_QUERY_THRESHOLD:
+            view, path = current_view()
+            logger.warning(json.dumps({
+                'time': datetime.now(timezone.utc).isoformat(),
+                'duration_ms': round(duration * 1000, 3),
+                'database': context['connection'].alias,
+                'shape': query_shape(sql),
+                'params': params_shape(params, many),
+                'many': many,
+                'view': view,
+                'path': path,
+                'stack': project_stack(sys._getframe(1)),
+            }, ensure_ascii=False))
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created.
+
+    Обёртка встаёт в начало списка: execute_wrapper() снимает последнюю
+    обёртку, а подключение может открыться внутри такого блока.
+    """
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_queries)
+
+
+class SlowQueryMiddleware:
+    """Запоминает запрос, чтобы привязать медленный SQL к view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.request = request
+        try:
+            return self.get_response(request)
+        finally:
+            _local.request = None
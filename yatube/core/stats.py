@@ -0,0 +1,10 @@
+def percentile(values, q):
+    """Перцентиль q (0-100) с линейной интерполяцией между соседями."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    fraction = position - lower
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
@@ -1,8 +1,41 @@
+import re
+
 from django import template
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from posts.links import MENTION_RE, TAG_RE
 
 register = template.Library()
+LINK_RE = re.compile(f'{TAG_RE.pattern}|{MENTION_RE.pattern}')
 
 
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+def link_html(match):
+    tag, username = match.groups()
+    if tag is not None:
+        url = reverse('posts:tag', args=(tag.casefold(),))
+        return f'<a href="{url}">{escape(match.group(0))}</a>'
+    name = username.rstrip('.')
+    if not name:
+        return escape(match.group(0))
+    url = reverse('posts:profile', args=(name,))
+    return f'<a href="{url}">@{escape(name)}</a>{username[len(name):]}'
+
+
+@register.filter
+def linkify(text):
+    """Текст со ссылками на страницы #тегов и профили @упомянутых."""
+    parts = []
+    position = 0
+    for match in LINK_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(link_html(match))
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return mark_safe(''.join(parts))
@@ -1,4 +1,48 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from core.accesslog import AsyncBatchHandler
+from core.loadtest import parse_mix, read_access_log
+from core.management.commands.benchmark import (
+    benchmark_cases, find_regressions, measure,
+)
+from core.metrics import collect, flush, inc, render, snapshot
+from core.management.commands.slow_queries import aggregate
+from core.nplusone import QueryCollector, query_shape
+from core.management.commands.memory_report import (
+    aggregate as aggregate_memory,
+)
+from core.management.commands.show_trace import read_spans
+from core.profiler import ThreadSampler, make_sampler
+from core.tracing import Span, activate, exporter
+from posts.models import Follow, Group, Post, User
+from posts.storage import HashedMediaStorage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_METRICS_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_PROFILER_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_TRACING_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +50,576 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.name = HashedMediaStorage().save(
+            'posts/file.txt', ContentFile(b'0123456789')
+        )
+        cls.url = settings.MEDIA_URL + cls.name
+
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляем тестовые медиа."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_hashed_file_is_immutable(self):
+        """Файл с хэшем в имени кэшируется навсегда, ETag - его хэш."""
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(response['ETag'].strip('"'), self.name)
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_request(self):
+        """Range отдаёт только запрошенные байты."""
+        cases = {
+            'bytes=2-4': (b'234', 'bytes 2-4/10'),
+            'bytes=7-': (b'789', 'bytes 7-9/10'),
+            'bytes=-2': (b'89', 'bytes 8-9/10'),
+        }
+        for header, (content, content_range) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b''.join(response.streaming_content), content
+                )
+                self.assertEqual(response['Content-Range'], content_range)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='x-accel-redirect')
+    def test_accel_redirect(self):
+        """С nginx приложение только указывает, какой файл отдать."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + self.name
+        )
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        self.assertEqual(response['Content-Disposition'], 'attachment')
+
+    def test_only_images_are_shown_inline(self):
+        """Не-картинки отдаются на скачивание, тип браузер не угадывает."""
+        image = HashedMediaStorage().save(
+            'posts/pixel.gif', ContentFile(b'GIF89a')
+        )
+        page = HashedMediaStorage().save(
+            'posts/x.html', ContentFile(b'<script>alert(1)</script>')
+        )
+        cases = {
+            image: ('image/gif', None),
+            page: ('application/octet-stream', 'attachment'),
+            self.name: ('application/octet-stream', 'attachment'),
+        }
+        for name, (content_type, disposition) in cases.items():
+            with self.subTest(name=name):
+                response = self.client.get(settings.MEDIA_URL + name)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertEqual(
+                    response.get('Content-Disposition'), disposition
+                )
+                self.assertEqual(
+                    response['X-Content-Type-Options'], 'nosniff'
+                )
+
+    def test_path_outside_media_root(self):
+        response = self.client.get(settings.MEDIA_URL + '../settings.py')
+        self.assertEqual(response.status_code, 404)
+
+
+class BenchmarkRegressionTests(TestCase):
+    def test_find_regressions(self):
+        """Регрессией считается рост p95 выше порога или рост запросов."""
+        baseline = {'100': {
+            'index': {'p95_ms': 10, 'queries': 5},
+            'profile': {'p95_ms': 10, 'queries': 5},
+        }}
+        results = {'100': {
+            'index': {'p95_ms': 11, 'queries': 5},
+            'profile': {'p95_ms': 13, 'queries': 6},
+            'post_detail': {'p95_ms': 100, 'queries': 50},
+        }}
+        regressions = find_regressions(results, baseline, threshold=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all('profile' in line for line in regressions))
+
+    def test_follow_cases_repeat_the_same_work(self):
+        """Каждая попытка follow и unfollow меняет подписку заново."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        post = Post.objects.create(author=author, text='Пост')
+        client = Client()
+        client.force_login(reader)
+        cases = {case[0]: case for case in benchmark_cases({
+            'group': Group.objects.create(title='Группа', slug='group'),
+            'author': author,
+            'post': post,
+            'reader': reader,
+        })}
+        for name in ('profile_follow', 'profile_unfollow'):
+            with self.subTest(name=name):
+                _, method, url, data, setup = cases[name]
+                first = measure(
+                    client, method, url, data, repeat=1, warmup=0,
+                    setup=setup,
+                )
+                result = measure(
+                    client, method, url, data, repeat=3, warmup=1,
+                    setup=setup,
+                )
+                self.assertEqual(result['queries_min'], first['queries'])
+                self.assertEqual(result['queries'], first['queries'])
+        self.assertFalse(Follow.objects.exists())
+
+
+class LoadTestHelpersTests(TestCase):
+    def test_read_access_log(self):
+        """Из access log берутся только GET-запросы."""
+        with tempfile.NamedTemporaryFile('w', suffix='.log') as log:
+            log.write(
+                '1.2.3.4 - - [01/Jan/2022:00:00:00 +0000] '
+                '"GET /group/cats/?page=2 HTTP/1.1" 200 512 "-" "curl"\n'
+                '1.2.3.4 - - [01/Jan/2022:00:00:01 +0000] '
+                '"POST /create/ HTTP/1.1" 302 0\n'
+                'мусор\n'
+            )
+            log.flush()
+            self.assertEqual(
+                read_access_log(log.name), ['/group/cats/?page=2']
+            )
+
+    def test_read_json_access_log(self):
+        """Access log из core.accesslog тоже можно повторить."""
+        with tempfile.NamedTemporaryFile('w', suffix='.log') as log:
+            log.write(
+                '{"time": 1, "method": "GET", "path": "/group/cats/", '
+                '"status": 200}\n'
+                '{"time": 2, "method": "POST", "path": "/create/", '
+                '"status": 302}\n'
+                '{"broken\n'
+            )
+            log.flush()
+            self.assertEqual(read_access_log(log.name), ['/group/cats/'])
+
+    def test_empty_access_log_is_an_error(self):
+        """Если из access log нечего повторять, команда не запускается."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+        with tempfile.NamedTemporaryFile('w', suffix='.log') as log:
+            log.write('мусор\n')
+            log.flush()
+            with self.assertRaisesMessage(CommandError, 'GET'):
+                call_command('loadtest', access_log=log.name)
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            parse_mix('browse=3,post=1'), {'browse': 3.0, 'post': 1.0}
+        )
+        with self.assertRaises(ValueError):
+            parse_mix('delete_everything=1')
+
+
+class NPlusOneTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(3):
+            Post.objects.create(
+                author=User.objects.create_user(username=f'user{index}'),
+                text='Тестовый пост',
+            )
+
+    def test_query_shape(self):
+        """Списки IN разной длины дают одну форму запроса."""
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s)'),
+            query_shape('SELECT *  FROM t WHERE id IN (%s)'),
+        )
+
+    def test_template_line_reported(self):
+        """Ленивая загрузка автора в цикле указывает на строку шаблона."""
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}\n'
+            '{% endfor %}'
+        )
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            template.render(Context({'posts': Post.objects.all()}))
+        (shape, count, sites), = collector.repeated(3)
+        self.assertIn('auth_user', shape)
+        self.assertEqual(count, 3)
+        self.assertEqual(sites, ['<unknown source>:2'])
+
+    def test_python_call_site_reported(self):
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            for post in Post.objects.all():
+                post.author
+        (_, _, sites), = collector.repeated(3)
+        self.assertIn('core/tests.py', sites[0])
+        self.assertIn('test_python_call_site_reported', sites[0])
+
+    @override_settings(NPLUSONE_SAMPLE_RATE=1, NPLUSONE_THRESHOLD=2)
+    def test_middleware_quiet_on_index(self):
+        with self.assertNoLogs('core.nplusone'):
+            self.client.get('/')
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def get_metrics(self):
+        return self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        ).content.decode()
+
+    def metric(self, text, sample):
+        match = re.search(
+            '^' + re.escape(sample) + r' (\S+)$', text, re.MULTILINE
+        )
+        self.assertIsNotNone(match, sample)
+        return float(match.group(1))
+
+    def test_metrics_page(self):
+        """/metrics показывает запросы, SQL, шаблоны и кэш по view."""
+        self.client.get('/')
+        text = self.get_metrics()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        labels = 'view="posts:index"'
+        self.assertGreaterEqual(self.metric(
+            text,
+            f'yatube_requests_total{{{labels},method="GET",status="200"}}',
+        ), 1)
+        self.assertGreaterEqual(self.metric(
+            text, f'yatube_request_duration_seconds_bucket{{{labels},'
+                  'le="+Inf"}',
+        ), 1)
+        self.assertGreater(
+            self.metric(text, f'yatube_db_queries_total{{{labels}}}'), 0
+        )
+        self.assertGreater(self.metric(
+            text, f'yatube_template_render_seconds_total{{{labels}}}'
+        ), 0)
+        self.assertGreater(self.metric(
+            text, f'yatube_cache_requests_total{{{labels},result="miss"}}'
+        ), 0)
+
+    def test_other_workers_are_summed(self):
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        with open(os.path.join(settings.METRICS_DIR, 'other.json'), 'w') as f:
+            json.dump([[
+                'yatube_db_queries_total', [['view', 'posts:profile']], 1000
+            ]], f)
+        text = self.get_metrics()
+        self.assertGreaterEqual(self.metric(
+            text, 'yatube_db_queries_total{view="posts:profile"}'
+        ), 1000)
+
+    def test_dead_workers_are_skipped(self):
+        """Файлы, которые давно не обновлялись, в сумму не входят."""
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, 'dead.json')
+        with open(path, 'w') as f:
+            json.dump([['yatube_access_log_dropped_total', [], 7]], f)
+        stale = time.time() - settings.METRICS_STALE_AFTER - 1
+        os.utime(path, (stale, stale))
+        key = ('yatube_access_log_dropped_total', ())
+        self.assertEqual(collect().get(key, 0), snapshot().get(key, 0))
+
+    def test_forked_worker_starts_empty(self):
+        """Воркер после fork не наследует счётчики и пишет свой файл."""
+        # Подменяем и счётчики, чтобы после теста вернулись настоящие.
+        with mock.patch('core.metrics._pid', -1), \
+                mock.patch('core.metrics._local', threading.local()), \
+                mock.patch('core.metrics._stores', [{('x', ()): 5}]):
+            self.assertEqual(snapshot(), {})
+            inc('yatube_access_log_dropped_total', (), 3)
+            flush(force=True)
+        path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+        with open(path) as f:
+            self.assertEqual(
+                json.load(f), [['yatube_access_log_dropped_total', [], 3]]
+            )
+
+    def test_metrics_closed_without_token(self):
+        """Без токена /metrics нет, в том числе с 127.0.0.1."""
+        cases = {
+            'secret': {},
+            None: {'HTTP_AUTHORIZATION': 'Bearer secret'},
+            'other': {'HTTP_AUTHORIZATION': 'Bearer secret'},
+        }
+        for token, headers in cases.items():
+            with self.subTest(token=token), \
+                    self.settings(METRICS_TOKEN=token):
+                response = self.client.get(
+                    '/metrics', REMOTE_ADDR='127.0.0.1', **headers
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_render_orders_buckets(self):
+        text = render({
+            ('yatube_response_size_bytes_bucket', (('le', '+Inf'),)): 2,
+            ('yatube_response_size_bytes_bucket', (('le', '1024'),)): 1,
+        })
+        self.assertLess(text.index('le="1024"'), text.index('le="+Inf"'))
+
+
+@override_settings(
+    PROFILER_TOKEN='secret', PROFILER_DIR=TEMP_PROFILER_DIR,
+    PROFILER_INTERVAL=0.001,
+)
+class ProfilerTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILER_DIR, ignore_errors=True)
+
+    def busy(self, sampler):
+        sampler.start()
+        deadline = time.monotonic() + 0.05
+        try:
+            while time.monotonic() < deadline:
+                pass
+        finally:
+            sampler.stop()
+        return sampler.collapsed()
+
+    def test_signal_sampler(self):
+        """В главном потоке стеки снимаются по сигналу таймера."""
+        collapsed = self.busy(make_sampler(0.001))
+        self.assertIn('busy (core/tests.py', collapsed)
+
+    def test_thread_sampler(self):
+        collapsed = self.busy(ThreadSampler(threading.get_ident(), 0.001))
+        self.assertIn('busy (core/tests.py', collapsed)
+
+    def test_profile_by_token(self):
+        response = self.client.get(
+            '/', HTTP_X_PROFILE='secret', HTTP_X_REQUEST_ID='req-1'
+        )
+        self.assertEqual(response['X-Request-ID'], 'req-1')
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_PROFILER_DIR, 'req-1.folded'))
+        )
+
+    def test_wrong_token_not_profiled(self):
+        response = self.client.get('/?profile=wrong')
+        self.assertFalse(response.has_header('X-Request-ID'))
+
+    @override_settings(PROFILER_SAMPLE_EVERY=1)
+    def test_sampled_request_profiled(self):
+        response = self.client.get('/about/author/')
+        self.assertTrue(response.has_header('X-Request-ID'))
+
+
+class SlowQueryLogTests(TestCase):
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_slow_query_logged_with_view(self):
+        cache.clear()
+        with self.assertLogs('core.slowlog') as logs:
+            self.client.get('/')
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        posts_query = next(
+            entry for entry in entries if 'posts_post' in entry['shape']
+        )
+        self.assertEqual(posts_query['view'], 'posts:index')
+        self.assertEqual(posts_query['path'], '/')
+        self.assertTrue(
+            any('posts/views.py' in line for line in posts_query['stack'])
+        )
+
+    def test_fast_queries_not_logged(self):
+        with self.assertNoLogs('core.slowlog'):
+            self.client.get('/')
+
+    def test_report(self):
+        """Формы запросов ранжируются по суммарному времени."""
+        entries = [
+            {'shape': 'SELECT a', 'duration_ms': 300, 'view': 'x'},
+            {'shape': 'SELECT b', 'duration_ms': 200, 'view': 'y'},
+            {'shape': 'SELECT b', 'duration_ms': 200, 'view': 'y'},
+        ]
+        report = {row['shape']: row for row in aggregate(entries)}
+        self.assertEqual(report['SELECT b']['total'], 400)
+        self.assertEqual(report['SELECT b']['views'], [('y', 2)])
+        with tempfile.NamedTemporaryFile('w', suffix='.log') as log:
+            log.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+            log.flush()
+            output = StringIO()
+            call_command('slow_queries', log=log.name, stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[1].strip(), 'SELECT b')
+
+
+@override_settings(TRACING_SAMPLE_RATE=1, TRACING_DIR=TEMP_TRACING_DIR)
+class TracingTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_TRACING_DIR, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_request_spans(self):
+        """Трасса содержит view, SQL, шаблоны с include и кэш."""
+        cache.clear()
+        response = self.client.get('/')
+        exporter.flush()
+        spans = read_spans(TEMP_TRACING_DIR, response['X-Trace-ID'])
+        by_id = {record['span_id']: record for record in spans}
+        names = {record['name'] for record in spans}
+        self.assertIn('view posts:index', names)
+        self.assertTrue({'sql', 'template', 'cache.get'} <= names)
+        templates = [
+            record for record in spans if record['name'] == 'template'
+        ]
+        page = next(
+            record for record in templates
+            if record['attributes']['template'] == 'posts/index.html'
+        )
+        self.assertTrue(any(
+            by_id.get(record['parent_id']) is page for record in templates
+        ))
+
+        output = StringIO()
+        call_command('show_trace', response['X-Trace-ID'], stdout=output)
+        self.assertIn('view posts:index', output.getvalue())
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_thumbnail_spans(self):
+        """Создание миниатюры попадает в трассу отдельным спаном."""
+        buffer = BytesIO()
+        Image.new('RGB', (4, 2)).save(buffer, 'PNG')
+        name = HashedMediaStorage().save(
+            'posts/black.png', ContentFile(buffer.getvalue())
+        )
+        root = Span('request', secrets.token_hex(16), None, {})
+        with activate(root):
+            thumbnail = get_thumbnail(name, '8x8', upscale=False)
+        exporter.flush()
+        spans = read_spans(TEMP_TRACING_DIR, root.trace_id)
+        created = next(
+            record for record in spans
+            if record['name'] == 'thumbnail.create'
+        )
+        self.assertEqual(created['attributes']['file'], thumbnail.name)
+
+    @override_settings(TRACING_SAMPLE_RATE=0)
+    def test_untraced_request(self):
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('X-Trace-ID'))
+
+
+class TestRunnerTests(TestCase):
+    def test_files_outside_base_dir(self):
+        """Тесты пишут access log и метрики во временный каталог."""
+        handler = logging.getLogger('core.accesslog').handlers[0]
+        self.assertEqual(handler.filename, settings.ACCESS_LOG)
+        for path in (settings.ACCESS_LOG, settings.METRICS_DIR):
+            with self.subTest(path=path):
+                self.assertFalse(path.startswith(settings.BASE_DIR))
+
+
+class MemoryProfileTests(TestCase):
+    @override_settings(MEMORY_PROFILE_SAMPLE_RATE=1)
+    def test_request_memory_logged(self):
+        cache.clear()
+        with self.assertLogs('core.memory') as logs:
+            self.client.get('/')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'posts:index')
+        self.assertGreater(entry['peak_bytes'], 0)
+        self.assertTrue(entry['top'])
+        self.assertTrue(all(site['size_diff'] > 0 for site in entry['top']))
+
+    @override_settings(MEMORY_PROFILE_SAMPLE_RATE=1)
+    def test_python_without_reset_peak(self):
+        """Без tracemalloc.reset_peak (Python < 3.9) запрос не падает."""
+        old_tracemalloc = SimpleNamespace(**{
+            name: getattr(tracemalloc, name) for name in dir(tracemalloc)
+            if name != 'reset_peak' and not name.startswith('__')
+        })
+        cache.clear()
+        with mock.patch('core.memory.tracemalloc', old_tracemalloc):
+            with self.assertLogs('core.memory') as logs:
+                self.client.get('/')
+            tracemalloc.start()
+            try:
+                with self.assertLogs('core.memory') as traced_logs:
+                    self.client.get('/about/author/')
+            finally:
+                tracemalloc.stop()
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertGreater(entry['peak_bytes'], 0)
+        entry = json.loads(traced_logs.records[0].getMessage())
+        self.assertIsNone(entry['peak_bytes'])
+
+    def test_report(self):
+        entries = [
+            {'view': 'posts:index', 'peak_bytes': 100, 'retained_bytes': 0,
+             'top': [{'file': 'posts/views.py', 'line': 10,
+                      'size_diff': 50}]},
+            {'view': 'posts:index', 'peak_bytes': 300, 'retained_bytes': 20,
+             'top': [{'file': 'posts/views.py', 'line': 10,
+                      'size_diff': 70}]},
+        ]
+        row, = aggregate_memory(entries)
+        self.assertEqual(row['peak_max'], 300)
+        self.assertEqual(row['retained_mean'], 10)
+        self.assertEqual(row['sites'], [('posts/views.py:10', 120)])
+        row, = aggregate_memory([dict(entries[0], peak_bytes=None)])
+        self.assertEqual((row['requests'], row['peak_max']), (1, 0))
+
+
+class AccessLogTests(TestCase):
+    def test_request_logged(self):
+        user = User.objects.create_user(username='reader')
+        self.client.force_login(user)
+        with self.assertLogs('core.accesslog') as logs:
+            self.client.get('/follow/')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'posts:follow_index')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['user_id'], user.pk)
+        self.assertGreater(entry['db_queries'], 0)
+        self.assertIn('cache_misses', entry)
+
+    def test_handler_writes_batches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'access.log')
+            handler = AsyncBatchHandler(path)
+            for number in range(100):
+                handler.emit(logging.makeLogRecord({'msg': str(number)}))
+            handler.flush()
+            with open(path) as log:
+                lines = log.read().splitlines()
+        self.assertEqual(lines, [str(number) for number in range(100)])
+
+    def test_full_queue_drops(self):
+        """Пока диск занят, лишние строки выбрасываются, запрос не ждёт."""
+        disk_free = threading.Event()
+
+        class SlowDiskHandler(AsyncBatchHandler):
+            def write(self, lines):
+                disk_free.wait()
+                self.written = lines
+
+        handler = SlowDiskHandler('unused.log', queue_size=1)
+        for number in range(5):
+            handler.emit(logging.makeLogRecord({'msg': str(number)}))
+        disk_free.set()
+        handler.flush()
+        self.assertGreaterEqual(handler.dropped, 3)
@@ -0,0 +1,185 @@
+"""Трассировка запросов: спаны view, SQL, шаблонов, кэша и миниатюр.
+
+Доля TRACING_SAMPLE_RATE запросов получает корневой спан, и всё, что
+выполняется внутри него, открывает дочерние спаны. Текущий спан лежит в
+contextvars, поэтому у каждого потока свой стек. Вне трассируемого
+запроса span() ничего не делает. Завершённые спаны копятся в памяти и
+пачками дописываются в TRACING_DIR/traces-<pid>.jsonl; команда
+show_trace рисует по ним водопад одного запроса.
+"""
+import atexit
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core.nplusone import query_shape
+
+_current_span = ContextVar('current_span', default=None)
+
+
+class SpanExporter:
+    """Буфер завершённых спанов, который сбрасывается в файл пачками."""
+
+    def __init__(self):
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+    def add(self, record):
+        with self.lock:
+            self.buffer.append(record)
+            due = (
+                len(self.buffer) >= settings.TRACING_BATCH_SIZE
+                or time.monotonic() - self.last_flush
+                >= settings.TRACING_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+        if not batch:
+            return
+        os.makedirs(settings.TRACING_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.TRACING_DIR, 'traces-%d.jsonl' % os.getpid()
+        )
+        data = ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n' for record in batch
+        )
+        with self.write_lock, open(path, 'a', encoding='utf-8') as file:
+            file.write(data)
+
+
+exporter = SpanExporter()
+atexit.register(exporter.flush)
+
+
+class Span:
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+        'start', 'started',
+    )
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.started = time.perf_counter_ns()
+
+    def finish(self):
+        exporter.add({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start,
+            'duration_ns': time.perf_counter_ns() - self.started,
+            'attributes': self.attributes,
+        })
+
+
+@contextmanager
+def activate(current):
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        current.attributes['error'] = type(error).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+def tracing():
+    """Идёт ли сейчас трассируемый запрос."""
+    return _current_span.get() is not None
+
+
+@contextmanager
+def span(name, **attributes):
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with activate(
+        Span(name, parent.trace_id, parent.span_id, attributes)
+    ) as current:
+        yield current
+
+
+def trace_sql(execute, sql, params, many, context):
+    with span('sql', statement=query_shape(sql), many=many):
+        return execute(sql, params, many, context)
+
+
+_template_render = Template.render
+
+
+def traced_template_render(self, context):
+    if not tracing():
+        return _template_render(self, context)
+    with span('template', template=self.name or self.origin.name):
+        return _template_render(self, context)
+
+
+def install():
+    """Оборачивает Template.render, через который рендерятся и include."""
+    Template.render = traced_template_render
+
+
+class TracedThumbnailBackend(ThumbnailBackend):
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with span('thumbnail', geometry=geometry_string):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        with span('thumbnail.create', file=thumbnail.name):
+            return super()._create_thumbnail(
+                source_image, geometry_string, options, thumbnail
+            )
+
+
+class TracingMiddleware:
+    """Корневой спан запроса.
+
+    Стоит последним в MIDDLEWARE, поэтому спан охватывает в основном
+    вызов view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.TRACING_SAMPLE_RATE:
+            return self.get_response(request)
+        root = Span('request', secrets.token_hex(16), None, {
+            'method': request.method, 'path': request.path,
+        })
+        with activate(root), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(trace_sql))
+            response = self.get_response(request)
+            match = request.resolver_match
+            root.name = 'view %s' % (match.view_name if match else '-')
+            root.attributes['status'] = response.status_code
+        response['X-Trace-ID'] = root.trace_id
+        return response
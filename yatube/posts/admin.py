@@ -1,6 +1,22 @@
 from django.contrib import admin
 
 from .models import Group, Post, Follow, Comment
+from .search import filter_matching, search_available
+
+
+class ImageDuplicateFilter(admin.SimpleListFilter):
+    title = 'похожая картинка'
+    parameter_name = 'image_duplicate'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'Есть'), ('no', 'Нет'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.exclude(image_duplicate_of=None)
+        if self.value() == 'no':
+            return queryset.filter(image_duplicate_of=None)
+        return queryset
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,12 +26,20 @@ class PostAdmin(admin.ModelAdmin):
         'pub_date',
         'author',
         'group',
+        'image_duplicate_of',
     )
     list_editable = ('group',)
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', ImageDuplicateFilter)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search_available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return filter_matching(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -0,0 +1,109 @@
+"""Автодополнение пользователей и групп по префиксу.
+
+Индекс - отсортированный список ключей (ник, имя, фамилия, имя с
+фамилией, слова названия группы, название целиком) в памяти процесса;
+поиск по префиксу - bisect и проход по соседним ключам. Индекс строится
+из базы при первом запросе и обновляется сигналами. Изменения, сделанные
+в других процессах, сигналы не приносят, поэтому раз в
+AUTOCOMPLETE_REFRESH_INTERVAL секунд индекс перестраивается (см.
+RefreshingIndex).
+"""
+import re
+from bisect import bisect_left, insort
+
+from .indexes import RefreshingIndex
+
+USER = 'user'
+GROUP = 'group'
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е')
+
+
+def user_entry(user):
+    full_name = user.get_full_name()
+    label = f'{full_name} ({user.username})' if full_name else user.username
+    keys = {normalize(user.username)}
+    if full_name:
+        keys.add(normalize(full_name))
+        keys.update(WORD_RE.findall(normalize(full_name)))
+    return label, user.username, keys
+
+
+def group_entry(group):
+    title = normalize(group.title)
+    keys = {title, normalize(group.slug)}
+    keys.update(WORD_RE.findall(title))
+    return group.title, group.slug, keys
+
+
+class AutocompleteIndex(RefreshingIndex):
+    refresh_setting = 'AUTOCOMPLETE_REFRESH_INTERVAL'
+
+    def _load(self):
+        from .models import Group, User
+
+        keys = []
+        entries = {}
+        users = User.objects.only(
+            'pk', 'username', 'first_name', 'last_name'
+        ).iterator()
+        for user in users:
+            self._collect(keys, entries, (USER, user.pk), user_entry(user))
+        for group in Group.objects.only('pk', 'title', 'slug').iterator():
+            self._collect(
+                keys, entries, (GROUP, group.pk), group_entry(group)
+            )
+        keys.sort()
+        return keys, entries
+
+    def _collect(self, keys, entries, ident, entry):
+        label, slug, entry_keys = entry
+        entries[ident] = (label, slug, entry_keys)
+        keys.extend((key, ident) for key in entry_keys)
+
+    def _apply(self, data, ident, entry):
+        """Заменяет ключи ident ключами entry; None - просто удаляет."""
+        keys, entries = data
+        _, _, old_keys = entries.pop(ident, (None, None, ()))
+        for key in old_keys:
+            position = bisect_left(keys, (key, ident))
+            if position < len(keys) and keys[position] == (key, ident):
+                del keys[position]
+        if entry is not None:
+            entries[ident] = entry
+            for key in entry[2]:
+                insort(keys, (key, ident))
+
+    def update(self, kind, obj):
+        entry = user_entry(obj) if kind == USER else group_entry(obj)
+        self._change((kind, obj.pk), entry)
+
+    def remove(self, kind, pk):
+        self._change((kind, pk), None)
+
+    def search(self, query, limit=10):
+        """(тип, подпись, ник или slug) для объектов с ключом на query."""
+        prefix = normalize(query.strip())
+        if not prefix:
+            return []
+        with self.lock:
+            keys, entries = self._current()
+            found = []
+            seen = set()
+            position = bisect_left(keys, (prefix,))
+            while position < len(keys) and len(found) < limit:
+                key, ident = keys[position]
+                if not key.startswith(prefix):
+                    break
+                if ident not in seen:
+                    seen.add(ident)
+                    label, slug, _ = entries[ident]
+                    found.append((ident[0], label, slug))
+                position += 1
+        return found
+
+
+autocomplete_index = AutocompleteIndex()
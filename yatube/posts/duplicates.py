@@ -0,0 +1,121 @@
+from django.conf import settings
+
+from .images import HASH_MASK
+from .indexes import RefreshingIndex
+
+HASH_BITS: int = 64
+
+
+def hamming_distance(first, second):
+    return bin((first ^ second) & HASH_MASK).count('1')
+
+
+class MultiIndexHashTable:
+    """Поиск 64-битных хэшей на расстоянии Хэмминга не больше max_distance.
+
+    Хэш режется на max_distance + 1 кусков, для каждого куска ведётся
+    словарь "значение куска -> ключи". Если хэши отличаются не больше
+    чем в max_distance битах, хотя бы один кусок у них совпадает целиком,
+    поэтому поиск - это max_distance + 1 обращений к словарям и проверка
+    немногих кандидатов, независимо от числа хранимых хэшей.
+    """
+
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        bounds = [HASH_BITS * i // chunks for i in range(chunks + 1)]
+        self.spans = [
+            (start, (1 << (end - start)) - 1)
+            for start, end in zip(bounds, bounds[1:])
+        ]
+        self.tables = [{} for _ in self.spans]
+        self.values = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def _chunks(self, value):
+        value &= HASH_MASK
+        return [(value >> start) & mask for start, mask in self.spans]
+
+    def add(self, key, value):
+        self.remove(key)
+        self.values[key] = value
+        for table, chunk in zip(self.tables, self._chunks(value)):
+            table.setdefault(chunk, set()).add(key)
+
+    def remove(self, key):
+        value = self.values.pop(key, None)
+        if value is None:
+            return
+        for table, chunk in zip(self.tables, self._chunks(value)):
+            keys = table.get(chunk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del table[chunk]
+
+    def search(self, value):
+        candidates = set()
+        for table, chunk in zip(self.tables, self._chunks(value)):
+            candidates.update(table.get(chunk, ()))
+        return {
+            key for key in candidates
+            if hamming_distance(self.values[key], value) <= self.max_distance
+        }
+
+
+class ImageHashIndex(RefreshingIndex):
+    """pHash всех картинок постов в памяти процесса.
+
+    Индекс строится из базы при первом поиске, дополняется при
+    сохранении постов этого процесса и раз в
+    POSTS_IMAGE_HASH_REFRESH_INTERVAL секунд перестраивается (см.
+    RefreshingIndex). Удалённые посты и откаченные транзакции оставляют
+    в индексе лишние записи, поэтому найденные посты перепроверяются в
+    базе.
+    """
+
+    refresh_setting = 'POSTS_IMAGE_HASH_REFRESH_INTERVAL'
+
+    def _load(self):
+        from .models import Post
+
+        table = MultiIndexHashTable(settings.POSTS_IMAGE_DUPLICATE_DISTANCE)
+        posts = (
+            Post.objects.exclude(image_phash=None)
+            .values_list('pk', 'image_phash')
+            .iterator()
+        )
+        for pk, phash in posts:
+            table.add(pk, phash)
+        return table
+
+    def _apply(self, table, pk, phash):
+        if phash is None:
+            table.remove(pk)
+        else:
+            table.add(pk, phash)
+
+    def add(self, pk, phash):
+        self._change(pk, phash)
+
+    def find(self, phash, exclude_pk=None):
+        """Id постов с похожей картинкой, старые первыми."""
+        from .models import Post
+
+        with self.lock:
+            candidates = self._current().search(phash) - {exclude_pk}
+        if not candidates:
+            return []
+        confirmed = Post.objects.filter(pk__in=candidates).values_list(
+            'pk', 'image_phash'
+        )
+        return sorted(
+            pk for pk, stored in confirmed
+            if stored is not None and hamming_distance(stored, phash)
+            <= settings.POSTS_IMAGE_DUPLICATE_DISTANCE
+        )
+
+
+image_hash_index = ImageHashIndex()
@@ -0,0 +1,167 @@
+"""Отпечатки текстов для поиска почти одинаковых постов и комментариев.
+
+Текст режется на перекрывающиеся куски по SHINGLE символов, от их
+множества считается MinHash из NUM_PERM минимумов. Чтобы не считать
+NUM_PERM хэш-функций для каждого куска, используется one permutation
+hashing: кусок хэшируется один раз, хэш выбирает одну из NUM_PERM ячеек,
+и в ячейке остаётся минимум. Пустая ячейка берёт значение ближайшей
+непустой справа со сдвигом по расстоянию до неё. Доля совпавших ячеек у
+двух текстов оценивает их близость по Жаккару.
+
+Подпись делится на BANDS полос по ROWS значений, хэш каждой полосы
+пишется в LSHBucket. Тексты близостью от ~0.5 почти наверняка
+совпадают хотя бы в одной полосе, поэтому проверка нового текста - один
+запрос по индексу (полоса, хэш) и сравнение подписей немногих
+кандидатов, сколько бы текстов ни было в базе.
+
+Длинные тексты сравниваются по первым MAX_LENGTH символам. Короткие
+тексты («спасибо!», «+1») не проверяются и не запоминаются:
+у них одинаковые копии - норма.
+"""
+import random
+import struct
+import zlib
+from datetime import timedelta
+from functools import lru_cache
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LSHBucket, TextFingerprint
+from .search import WORD_RE
+
+SHINGLE: int = 5
+# Дальше начала текста не смотрим, чтобы проверка стоила одинаково для
+# любого текста.
+MAX_LENGTH: int = 2000
+NUM_PERM: int = 64
+BANDS: int = 16
+ROWS: int = NUM_PERM // BANDS
+MAX_CANDIDATES: int = 50
+MERSENNE = (1 << 61) - 1
+# Один и тот же seed, иначе подписи из базы перестанут совпадать
+# с новыми после перезапуска.
+_rng = random.Random(0)
+HASH_A = _rng.randrange(1, MERSENNE)
+HASH_B = _rng.randrange(MERSENNE)
+ROTATION = 0x9E3779B9
+SIGNATURE = struct.Struct(f'<{NUM_PERM}I')
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall(text.casefold().replace('ё', 'е')))
+
+
+def signature(text):
+    """MinHash нормализованного текста; для коротких - None."""
+    if len(text) < settings.NEAR_DUPLICATE_MIN_LENGTH:
+        return None
+    return minhash(text[:MAX_LENGTH])
+
+
+# Кэш зависит только от текста: настройки проверяет signature.
+@lru_cache(maxsize=128)
+def minhash(text):
+    bins = [None] * NUM_PERM
+    shingles = {
+        zlib.crc32(text[start:start + SHINGLE].encode())
+        for start in range(len(text) - SHINGLE + 1)
+    }
+    for value in shingles:
+        rank, index = divmod((HASH_A * value + HASH_B) % MERSENNE, NUM_PERM)
+        if bins[index] is None or rank < bins[index]:
+            bins[index] = rank
+    if not shingles:
+        return None
+    values = []
+    for index in range(NUM_PERM):
+        distance = 0
+        while bins[(index + distance) % NUM_PERM] is None:
+            distance += 1
+        rank = bins[(index + distance) % NUM_PERM]
+        values.append((rank + distance * ROTATION) & 0xFFFFFFFF)
+    return tuple(values)
+
+
+def band_buckets(values):
+    packed = SIGNATURE.pack(*values)
+    size = len(packed) // BANDS
+    for band in range(BANDS):
+        chunk = packed[band * size:(band + 1) * size]
+        digest = blake2b(chunk, digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def similarity(first, second):
+    return sum(a == b for a, b in zip(first, second)) / NUM_PERM
+
+
+def find_duplicate(text, exclude=None):
+    """Недавний текст, почти совпадающий с text, или None.
+
+    exclude - запрос к TextFingerprint для отпечатков, которые не
+    считаются (например, прошлая версия редактируемого поста).
+    """
+    values = signature(normalize(text))
+    if values is None:
+        return None
+    since = timezone.now() - timedelta(
+        seconds=settings.NEAR_DUPLICATE_WINDOW
+    )
+    buckets = Q()
+    for band, bucket in band_buckets(values):
+        buckets |= Q(band=band, bucket=bucket)
+    candidates = TextFingerprint.objects.filter(
+        pk__in=LSHBucket.objects.filter(buckets).values('fingerprint_id'),
+        created__gte=since,
+    )
+    if exclude is not None:
+        candidates = candidates.exclude(exclude)
+    for fingerprint in candidates[:MAX_CANDIDATES]:
+        stored = SIGNATURE.unpack(bytes(fingerprint.signature))
+        if similarity(stored, values) >= settings.NEAR_DUPLICATE_THRESHOLD:
+            return fingerprint
+    return None
+
+
+def remember(post, comment, text, created, new=False):
+    """Перезаписывает отпечаток поста или комментария."""
+    values = signature(normalize(text))
+    if new and values is None:
+        return
+    with transaction.atomic():
+        if not new:
+            TextFingerprint.objects.filter(
+                post=post, comment=comment
+            ).delete()
+        if values is None:
+            return
+        fingerprint = TextFingerprint.objects.create(
+            post=post, comment=comment, created=created,
+            signature=SIGNATURE.pack(*values),
+        )
+        LSHBucket.objects.bulk_create(
+            LSHBucket(fingerprint=fingerprint, band=band, bucket=bucket)
+            for band, bucket in band_buckets(values)
+        )
+
+
+def remember_post(post, new=False):
+    remember(post, None, post.text, post.pub_date, new)
+
+
+def remember_comment(comment, new=False):
+    remember(comment.post, comment, comment.text, comment.created, new)
+
+
+def prune():
+    """Удаляет отпечатки старше окна проверки; возвращает их число."""
+    since = timezone.now() - timedelta(
+        seconds=settings.NEAR_DUPLICATE_WINDOW
+    )
+    LSHBucket.objects.filter(fingerprint__created__lt=since).delete()
+    count, _ = TextFingerprint.objects.filter(created__lt=since).delete()
+    return count
@@ -0,0 +1,109 @@
+"""Граф подписок в формате CSR для команды update_follow_suggestions.
+
+Снимок графа - два CSR на диске: подписки (пользователь -> авторы) и
+подписчики (автор -> пользователи). indptr - массив int64 длиной
+max_pk + 2, индексом служит сам pk: соседи узла v лежат в
+indices[indptr[v]:indptr[v + 1]]. Воркеры открывают файлы через mmap,
+поэтому снимок не копируется в каждый процесс, а срезы memoryview
+не копируют данные.
+
+Как и seeding, модуль не импортирует модели: воркеры получают только
+диапазоны pk и возвращают кортежи.
+"""
+import heapq
+import mmap
+import os
+from array import array
+from itertools import accumulate
+
+FOLLOWS = 'follows'
+FOLLOWERS = 'followers'
+
+snapshot = None
+
+
+def write_csr(directory, name, edges, size):
+    """Пишет CSR из пар (узел, сосед), отсортированных по узлу."""
+    counts = array('q', bytes(8 * (size + 1)))
+    indices = array('i')
+    for node, neighbour in edges:
+        counts[node + 1] += 1
+        indices.append(neighbour)
+    indptr = array('q', accumulate(counts))
+    with open(os.path.join(directory, f'{name}.indptr'), 'wb') as file:
+        indptr.tofile(file)
+    with open(os.path.join(directory, f'{name}.indices'), 'wb') as file:
+        indices.tofile(file)
+    return len(indices)
+
+
+def map_array(path, typecode):
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return memoryview(array(typecode))
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(data).cast(typecode)
+
+
+class CSR:
+    def __init__(self, directory, name):
+        path = os.path.join(directory, name)
+        self.indptr = map_array(f'{path}.indptr', 'q')
+        self.indices = map_array(f'{path}.indices', 'i')
+
+    def __getitem__(self, node):
+        if node + 1 >= len(self.indptr):
+            return self.indices[0:0]
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+
+def open_snapshot(directory):
+    """Инициализатор воркера: открывает снимок графа."""
+    global snapshot
+    snapshot = CSR(directory, FOLLOWS), CSR(directory, FOLLOWERS)
+
+
+def score_user(user, follows, followers, max_fanout):
+    """Оценки кандидатов в подписки пользователя user.
+
+    Друзья друзей: +1 за каждого автора user, подписанного на кандидата.
+    Совместные подписки: люди, подписанные на тех же авторов, что и
+    user, голосуют за свои подписки весом 1 / число подписчиков общего
+    автора; авторов с подписчиками больше max_fanout пропускаем, иначе
+    один знаменитый автор стоит как весь граф.
+    """
+    following = follows[user]
+    scores = {}
+    for author in following:
+        for candidate in follows[author]:
+            scores[candidate] = scores.get(candidate, 0) + 1
+        readers = followers[author]
+        if len(readers) > max_fanout:
+            continue
+        weight = 1 / len(readers)
+        for reader in readers:
+            if reader == user:
+                continue
+            for candidate in follows[reader]:
+                scores[candidate] = scores.get(candidate, 0) + weight
+    scores.pop(user, None)
+    for author in following:
+        scores.pop(author, None)
+    return scores
+
+
+def suggest_range(start, stop, limit, max_fanout):
+    """(пользователь, автор, оценка) - лучшие limit для pk из [start, stop)."""
+    follows, followers = snapshot
+    rows = []
+    for user in range(start, stop):
+        scores = score_user(user, follows, followers, max_fanout)
+        top = heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+        rows.extend((user, author, score) for author, score in top)
+    return rows
+
+
+def run_range(task):
+    return suggest_range(*task)
@@ -1,7 +1,23 @@
+import os
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import Q
 from django.forms import ModelForm
+from PIL import Image
+
+from uploads.models import Upload
 
+from .duplicates import image_hash_index
+from .fingerprints import find_duplicate
+from .images import image_metadata
 from .models import Post, Comment
 
+NEAR_DUPLICATE_ERROR = 'Почти такой же текст недавно уже публиковали'
+
 
 class PostForm(ModelForm):
     class Meta:
@@ -14,8 +30,108 @@ class PostForm(ModelForm):
             "image": "Картинка"
         }
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        exclude = None
+        if self.instance.pk is not None:
+            exclude = Q(post=self.instance, comment=None)
+        if find_duplicate(text, exclude):
+            raise forms.ValidationError(NEAR_DUPLICATE_ERROR)
+        return text
+
+    def clean(self):
+        """Картинка может быть заранее загружена по частям через uploads.
+
+        Тогда вместо файла приходит id загрузки в поле upload.
+        """
+        cleaned_data = super().clean()
+        upload_id = self.data.get('upload')
+        if upload_id:
+            try:
+                upload = Upload.objects.get(
+                    pk=upload_id, user=self.user, status=Upload.COMPLETE
+                )
+            except (Upload.DoesNotExist, ValidationError):
+                raise forms.ValidationError('Загрузка не найдена')
+            self.upload_format = self.staged_image_format(upload)
+            cleaned_data['upload'] = upload
+        self.image_metadata = self.new_image_metadata(cleaned_data)
+        if (
+            settings.POSTS_REJECT_DUPLICATE_IMAGES
+            and self.image_metadata is not None
+            and image_hash_index.find(
+                self.image_metadata[3], self.instance.pk
+            )
+        ):
+            self.add_error('image', 'Такая картинка уже есть на сайте')
+        return cleaned_data
+
+    @staticmethod
+    def staged_image_format(upload):
+        """Проверка загрузки так же, как в forms.ImageField.to_python.
+
+        Загрузка по частям минует ImageField, поэтому файл открывается
+        Pillow здесь. Возвращается определённый им формат.
+        """
+        try:
+            with open(upload.staging_path, 'rb') as staging:
+                with Image.open(staging) as image:
+                    image.verify()
+                    return image.format
+        except Exception:
+            # Image.DecompressionBombError тоже сюда.
+            raise forms.ValidationError(
+                forms.ImageField.default_error_messages['invalid_image'],
+                code='invalid_image',
+            )
+
+    def new_image_metadata(self, cleaned_data):
+        """Метаданные новой картинки: загруженной с формой или по частям.
+
+        Считаются один раз здесь и передаются в Post.save, чтобы не
+        открывать файл повторно.
+        """
+        upload = cleaned_data.get('upload')
+        image = cleaned_data.get('image')
+        try:
+            if upload is not None:
+                with open(upload.staging_path, 'rb') as staging:
+                    return image_metadata(staging)
+            if isinstance(image, UploadedFile):
+                return image_metadata(image)
+        except (OSError, SyntaxError, ValueError):
+            pass
+        return None
+
+    def save(self, commit=True):
+        upload = self.cleaned_data.get('upload')
+        if upload is not None:
+            # Расширение по формату из Pillow, а не по имени от клиента.
+            name = '{}.{}'.format(
+                os.path.splitext(upload.filename)[0],
+                self.upload_format.lower(),
+            )
+            with open(upload.staging_path, 'rb') as staging:
+                self.instance.image.save(name, File(staging), save=False)
+        self.instance.known_image_metadata = self.image_metadata
+        post = super().save(commit=commit)
+        if upload is not None:
+            os.remove(upload.staging_path)
+            upload.delete()
+        return post
+
 
 class CommentForm(ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        if find_duplicate(text):
+            raise forms.ValidationError(NEAR_DUPLICATE_ERROR)
+        return text
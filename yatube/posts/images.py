@@ -0,0 +1,78 @@
+import base64
+import math
+from io import BytesIO
+
+from PIL import Image
+
+PLACEHOLDER_SIZE: int = 8
+PHASH_IMAGE_SIZE: int = 32
+PHASH_SIZE: int = 8
+HASH_MASK: int = (1 << 64) - 1
+# Строки косинусов DCT-II; нужны только первые PHASH_SIZE частот.
+DCT_COS = [
+    [
+        math.cos((2 * x + 1) * u * math.pi / (2 * PHASH_IMAGE_SIZE))
+        for x in range(PHASH_IMAGE_SIZE)
+    ]
+    for u in range(PHASH_SIZE)
+]
+
+
+def to_signed(value):
+    """64-битный хэш в диапазон BigIntegerField."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def perceptual_hash(image):
+    """pHash: знаки низкочастотных коэффициентов DCT относительно медианы.
+
+    Картинка сжимается до 32x32 в оттенках серого, из двумерного DCT
+    берётся угол 8x8. Небольшие правки картинки (пересжатие, изменение
+    размера, яркости, водяной знак) меняют лишь несколько бит из 64.
+    """
+    gray = image.convert('L').resize(
+        (PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.BOX
+    )
+    pixels = gray.tobytes()
+    rows = [
+        pixels[y * PHASH_IMAGE_SIZE:(y + 1) * PHASH_IMAGE_SIZE]
+        for y in range(PHASH_IMAGE_SIZE)
+    ]
+    # DCT раздельно: сначала по строкам, потом по столбцам.
+    row_dct = [
+        [sum(p * c for p, c in zip(row, cos_u)) for cos_u in DCT_COS]
+        for row in rows
+    ]
+    coefficients = [
+        sum(cos_v[y] * row_dct[y][u] for y in range(PHASH_IMAGE_SIZE))
+        for cos_v in DCT_COS
+        for u in range(PHASH_SIZE)
+    ]
+    # Постоянная составляющая (средняя яркость) в медиану не входит.
+    median = sorted(coefficients[1:])[len(coefficients[1:]) // 2]
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return to_signed(value)
+
+
+def image_metadata(file):
+    """Размеры картинки, крошечная заглушка для неё и её pHash.
+
+    Заглушка - картинка не больше 8x8 с сохранением пропорций в виде
+    data URI (около двухсот байт). Браузер растягивает её на место
+    будущей картинки, пока та не загрузилась.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+        # Для JPEG декодер сразу читает уменьшенную копию.
+        image.draft('RGB', (PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE))
+        preview = image.convert('RGB')
+    file.seek(0)
+    phash = perceptual_hash(preview)
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BOX)
+    buffer = BytesIO()
+    preview.save(buffer, format='PNG', optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return width, height, f'data:image/png;base64,{encoded}', phash
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+class RefreshingIndex:
+    """Индекс в памяти процесса, который строится из базы.
+
+    Индекс загружается (_load) при первом обращении и дальше меняется
+    изменениями этого процесса (_change). Изменения из других процессов
+    он видит после перестройки: раз в refresh_setting секунд она идёт в
+    фоновом потоке, запросы пока обслуживает старый индекс, а изменения,
+    пришедшие за это время, применяются (_apply) и к новому.
+    """
+
+    refresh_setting = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = None
+        self.loaded = 0
+        self.pending = None
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _apply(self, data, key, value):
+        raise NotImplementedError
+
+    def _refresh(self):
+        try:
+            data = self._load()
+            with self.lock:
+                for key, value in self.pending:
+                    self._apply(data, key, value)
+                self.data = data
+                self.loaded = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+            connections.close_all()
+
+    def _change(self, key, value):
+        with self.lock:
+            if self.data is None:
+                return
+            self._apply(self.data, key, value)
+            if self.pending is not None:
+                self.pending.append((key, value))
+
+    def _current(self):
+        """Индекс для поиска; вызывается под self.lock."""
+        if self.data is None:
+            self.data = self._load()
+            self.loaded = time.monotonic()
+        elif (
+            self.pending is None
+            and time.monotonic() - self.loaded
+            > getattr(settings, self.refresh_setting)
+        ):
+            self.pending = []
+            threading.Thread(target=self._refresh, daemon=True).start()
+        return self.data
+
+    def clear(self):
+        with self.lock:
+            self.data = None
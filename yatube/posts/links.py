@@ -0,0 +1,126 @@
+"""Хэштеги и @упоминания в текстах постов и комментариев.
+
+При сохранении поста или комментария ссылки из его текста
+перезаписываются в таблицы TagLink и Mention. Страницы тегов и
+упоминаний читают только эти таблицы по индексу (тег или пользователь,
+дата), без поиска по тексту.
+"""
+import re
+
+from django.db import transaction
+
+from .models import Comment, Mention, Post, Tag, TagLink, User
+
+TAG_RE = re.compile(r'(?<![\w#])#(\w{1,100})')
+# В нике Django допустимы буквы, цифры и @.+-_; точку в конце
+# предложения ником не считаем.
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]{1,150})')
+
+
+def extract_tags(text):
+    return {name.casefold() for name in TAG_RE.findall(text)}
+
+
+def extract_mentions(text):
+    return {name.rstrip('.') for name in MENTION_RE.findall(text)} - {''}
+
+
+def replace_links(post, comment, text, created, new=False):
+    """Перезаписывает ссылки одного текста: поста или комментария."""
+    tags = extract_tags(text)
+    usernames = extract_mentions(text)
+    if new and not tags and not usernames:
+        return
+    with transaction.atomic():
+        TagLink.objects.filter(post=post, comment=comment).delete()
+        Mention.objects.filter(post=post, comment=comment).delete()
+        if tags:
+            Tag.objects.bulk_create(
+                [Tag(name=name) for name in tags], ignore_conflicts=True
+            )
+            TagLink.objects.bulk_create(
+                TagLink(
+                    tag_id=tag_id, post=post, comment=comment,
+                    created=created,
+                )
+                for tag_id in Tag.objects.filter(
+                    name__in=tags
+                ).values_list('pk', flat=True)
+            )
+        if usernames:
+            Mention.objects.bulk_create(
+                Mention(
+                    user_id=user_id, post=post, comment=comment,
+                    created=created,
+                )
+                for user_id in User.objects.filter(
+                    username__in=usernames
+                ).values_list('pk', flat=True)
+            )
+
+
+def update_post_links(post, new=False):
+    replace_links(post, None, post.text, post.pub_date, new)
+
+
+def update_comment_links(comment, new=False):
+    replace_links(
+        comment.post, comment, comment.text, comment.created, new
+    )
+
+
+def rebuild_links(batch_size=1000):
+    """Заново извлекает все ссылки; возвращает (теги, упоминания).
+
+    Нужна для текстов, сохранённых до появления таблиц или в обход
+    сигналов. Тексты читаются потоком, ссылки пишутся пачками.
+    """
+    tag_ids = {}
+    user_ids = dict(User.objects.values_list('username', 'pk'))
+    tag_links, mentions = [], []
+    counts = [0, 0]
+
+    def flush():
+        TagLink.objects.bulk_create(tag_links, batch_size)
+        Mention.objects.bulk_create(mentions, batch_size)
+        counts[0] += len(tag_links)
+        counts[1] += len(mentions)
+        tag_links.clear()
+        mentions.clear()
+
+    def collect(post_id, comment_id, text, created):
+        tags = extract_tags(text)
+        missing = tags - tag_ids.keys()
+        if missing:
+            Tag.objects.bulk_create(
+                [Tag(name=name) for name in missing], ignore_conflicts=True
+            )
+            tag_ids.update(
+                Tag.objects.filter(name__in=missing).values_list('name', 'pk')
+            )
+        tag_links.extend(
+            TagLink(tag_id=tag_ids[name], post_id=post_id,
+                    comment_id=comment_id, created=created)
+            for name in tags
+        )
+        mentions.extend(
+            Mention(user_id=user_ids[name], post_id=post_id,
+                    comment_id=comment_id, created=created)
+            for name in extract_mentions(text) if name in user_ids
+        )
+        if len(tag_links) + len(mentions) >= batch_size:
+            flush()
+
+    with transaction.atomic():
+        TagLink.objects.all().delete()
+        Mention.objects.all().delete()
+        posts = Post.objects.values_list('pk', 'text', 'pub_date')
+        for pk, text, created in posts.iterator():
+            collect(pk, None, text, created)
+        comments = Comment.objects.values_list(
+            'post_id', 'pk', 'text', 'created'
+        )
+        for post_id, pk, text, created in comments.iterator():
+            collect(post_id, pk, text, created)
+        flush()
+    return tuple(counts)
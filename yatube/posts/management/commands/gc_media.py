@@ -0,0 +1,123 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+
+UPLOAD_DIR = 'posts'
+
+
+def walk_files(path):
+    """Обходит дерево каталогов через os.scandir, не собирая его в список."""
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def thumbnails_of(image_file):
+    """Миниатюры sorl, построенные для файла.
+
+    У хранилища ключей sorl нет публичного метода для списка миниатюр,
+    поэтому читаем его так же, как это делает сам KVStore.delete_thumbnails.
+    """
+    keys = default.kvstore._get(image_file.key, identity='thumbnails') or []
+    thumbnails = (default.kvstore._get(key) for key in keys)
+    return [thumbnail for thumbnail in thumbnails if thumbnail]
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые больше не ссылается ни один '
+        'пост, вместе с их миниатюрами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=24 * 60 * 60,
+            help='Не трогать файлы моложе стольких секунд (по умолчанию '
+                 'сутки): их могли загрузить, но ещё не сохранить пост.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько файлов удалять между паузами.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.5,
+            help='Пауза между пачками удалений в секундах.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что будет удалено.',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        referenced = set(
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True)
+            .iterator()
+        )
+        deadline = time.time() - options['grace']
+        root = os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)
+        self.files = self.reclaimed = 0
+        batch = []
+        for entry in walk_files(root):
+            name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+            name = name.replace(os.sep, '/')
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if name in referenced or stat.st_mtime > deadline:
+                continue
+            batch.append((entry.path, name, stat.st_size))
+            if len(batch) >= options['batch_size']:
+                self.remove(batch, storage, options['dry_run'])
+                batch = []
+                if not options['dry_run']:
+                    time.sleep(options['sleep'])
+        self.remove(batch, storage, options['dry_run'])
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} файлов: {self.files}, освобождено байт: {self.reclaimed}'
+        )
+
+    def remove(self, batch, storage, dry_run):
+        """Удаляет пачку файлов, ещё раз проверив, что на них нет ссылок.
+
+        Набор ссылок собран в начале обхода, а пост, созданный позже, мог
+        переиспользовать старый файл с тем же содержимым.
+        """
+        if not batch:
+            return
+        referenced = set(Post.objects.filter(
+            image__in=[name for _, name, _ in batch]
+        ).values_list('image', flat=True))
+        for path, name, size in batch:
+            if name in referenced:
+                continue
+            image_file = ImageFile(name, storage)
+            thumbnails = thumbnails_of(image_file)
+            size += sum(
+                thumbnail.storage.size(thumbnail.name)
+                for thumbnail in thumbnails if thumbnail.exists()
+            )
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                default.kvstore.delete(image_file)
+            self.files += 1 + len(thumbnails)
+            self.reclaimed += size
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.storage import is_hashed_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище с адресацией по содержимому. '
+        'Старые файлы не удаляются: ссылки на них переключаются по одной, '
+        'поэтому сайт продолжает работать во время переноса. '
+        'Освободившиеся файлы потом убирает сборщик мусора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов читать из базы за один запрос.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько файлов будет перенесено.',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        posts = (
+            Post.objects.exclude(image='')
+            .values_list('pk', 'image')
+            .order_by('pk')
+            .iterator(chunk_size=options['batch_size'])
+        )
+        moved = missing = skipped = 0
+        for pk, name in posts:
+            if is_hashed_name(name):
+                skipped += 1
+                continue
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Пост {pk}: файл {name} не найден')
+                continue
+            if options['dry_run']:
+                moved += 1
+                continue
+            with storage.open(name) as content:
+                new_name = storage.save(name, content)
+            # Обновляем только если картинку не заменили, пока мы копировали.
+            moved += Post.objects.filter(pk=pk, image=name).update(
+                image=new_name
+            )
+        self.stdout.write(
+            f'Перенесено: {moved}, уже в новом формате: {skipped}, '
+            f'не найдено: {missing}'
+        )
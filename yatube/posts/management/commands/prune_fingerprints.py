@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.fingerprints import prune
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет отпечатки текстов старше NEAR_DUPLICATE_WINDOW: с ними '
+        'новые тексты уже не сравниваются.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено отпечатков: {prune()}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.links import rebuild_links
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново извлекает хэштеги и упоминания из всех постов и '
+        'комментариев. Нужна после bulk-загрузок, которые не шлют сигналов.'
+    )
+
+    def handle(self, *args, **options):
+        tags, mentions = rebuild_links()
+        self.stdout.write(f'Ссылок на теги: {tags}, упоминаний: {mentions}')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовый индекс постов. Нужна после '
+        'bulk-загрузок и правок в обход модели, которые не шлют сигналов.'
+    )
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite')
+        count = search.rebuild_index()
+        self.stdout.write(f'Проиндексировано постов: {count}')
@@ -0,0 +1,204 @@
+import multiprocessing
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import search, seeding
+from posts.seeding import SEED_PASSWORD, run_chunk
+from posts.models import Comment, Follow, Group, Post, User
+
+CHUNK_SIZE: int = 10000
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Позволяет записать свои даты в поля с auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками с распределениями как на живом сайте. '
+        'При одинаковом --seed получаются одинаковые данные (даты '
+        'отсчитываются от момента запуска). Пароль всех пользователей - '
+        f'"{SEED_PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows-per-user', type=int, default=20,
+            help='Среднее число подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней разбросать даты постов и комментариев.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Число процессов, генерирующих данные.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Размер пачки для bulk_create; по умолчанию - наибольший, '
+                 'который допускает база.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and (options['posts'] or options['comments']):
+            raise CommandError(
+                'Посты и комментарии пишут новые пользователи: '
+                'для них нужен --users больше 0.'
+            )
+        self.options = options
+        self.now = timezone.now()
+        seconds = options['days'] * 24 * 60 * 60
+        workers = max(options['workers'], 1)
+        self.pool = multiprocessing.Pool(workers) if workers > 1 else None
+        try:
+            users = self.create_users()
+            groups = self.create_groups()
+            posts = self.create_posts(users, groups, seconds)
+            self.create_comments(users, posts, seconds)
+            self.create_follows(users)
+            if search.search_available():
+                search.rebuild_index()
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+
+    def chunks(self, function, total, *args, offset=0):
+        """Порции данных в фиксированном порядке, независимо от воркеров.
+
+        offset сдвигает номера строк, чтобы имена пользователей и slug
+        групп не совпали с уже созданными прошлым запуском.
+        """
+        seed = self.options['seed']
+        tasks = [
+            (function, (seed, chunk, offset + start,
+                        min(CHUNK_SIZE, total - start)) + args)
+            for chunk, start in enumerate(range(0, total, CHUNK_SIZE))
+        ]
+        if self.pool is None:
+            return map(run_chunk, tasks)
+        return self.pool.imap(run_chunk, tasks)
+
+    def insert(self, model, objects, **kwargs):
+        with transaction.atomic():
+            model.objects.bulk_create(
+                objects, batch_size=self.options['batch_size'], **kwargs
+            )
+
+    def new_pks(self, model, before, ordering='pk'):
+        return list(
+            model.objects.filter(pk__gt=before or 0)
+            .order_by(ordering)
+            .values_list('pk', flat=True)
+        )
+
+    def report(self, model, count):
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {count}')
+
+    def create_users(self):
+        before = User.objects.aggregate(max_pk=Max('pk'))['max_pk']
+        password = make_password(SEED_PASSWORD)
+        for rows in self.chunks(
+            seeding.generate_users, self.options['users'], offset=before or 0
+        ):
+            self.insert(User, [
+                User(
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                    password=password,
+                )
+                for username, first_name, last_name, email in rows
+            ])
+        users = self.new_pks(User, before)
+        self.report(User, len(users))
+        return users
+
+    def create_groups(self):
+        before = Group.objects.aggregate(max_pk=Max('pk'))['max_pk']
+        for rows in self.chunks(
+            seeding.generate_groups, self.options['groups'],
+            offset=before or 0
+        ):
+            self.insert(Group, [
+                Group(title=title, slug=slug, description=text)
+                for title, slug, text in rows
+            ])
+        groups = self.new_pks(Group, before)
+        self.report(Group, len(groups))
+        return groups
+
+    def create_posts(self, users, groups, seconds):
+        before = Post.objects.aggregate(max_pk=Max('pk'))['max_pk']
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            for rows in self.chunks(
+                seeding.generate_posts, self.options['posts'],
+                len(users), len(groups), seconds,
+            ):
+                self.insert(Post, [
+                    Post(
+                        author_id=users[author],
+                        group_id=groups[group] if group is not None else None,
+                        text=text,
+                        pub_date=self.now - timedelta(seconds=age),
+                    )
+                    for author, group, text, age in rows
+                ])
+        posts = self.new_pks(Post, before, '-pub_date')
+        self.report(Post, len(posts))
+        return posts
+
+    def create_comments(self, users, posts, seconds):
+        if not posts:
+            return
+        with explicit_dates(Comment._meta.get_field('created')):
+            for rows in self.chunks(
+                seeding.generate_comments, self.options['comments'],
+                len(users), len(posts), seconds,
+            ):
+                self.insert(Comment, [
+                    Comment(
+                        post_id=posts[post],
+                        author_id=users[author],
+                        text=text,
+                        created=self.now - timedelta(seconds=age),
+                    )
+                    for post, author, text, age in rows
+                ])
+        self.report(Comment, self.options['comments'])
+
+    def create_follows(self, users):
+        # С ignore_conflicts bulk_create не сообщает, сколько строк
+        # вставлено на самом деле, поэтому считаем по таблице.
+        before = Follow.objects.count()
+        for rows in self.chunks(
+            seeding.generate_follows, len(users),
+            len(users), self.options['follows_per_user'],
+        ):
+            self.insert(Follow, [
+                Follow(user_id=users[user], author_id=users[author])
+                for user, author in rows
+            ], ignore_conflicts=True)
+        self.report(Follow, Follow.objects.count() - before)
@@ -0,0 +1,90 @@
+import multiprocessing
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from posts import follow_graph
+from posts.models import Follow, FollowSuggestion, User
+
+CHUNK_SIZE: int = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает предложения «на кого подписаться» по снимку графа '
+        'подписок: друзья друзей и совместные подписки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Сколько предложений хранить на пользователя.',
+        )
+        parser.add_argument(
+            '--max-fanout', type=int, default=1000,
+            help='Авторы с большим числом подписчиков не участвуют '
+                 'в совместных подписках.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+        )
+        parser.add_argument(
+            '--snapshot-dir', default=None,
+            help='Куда выгрузить граф; по умолчанию - временный каталог.',
+        )
+
+    def handle(self, *args, **options):
+        if options['snapshot_dir']:
+            self.run(options['snapshot_dir'], options)
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            self.run(directory, options)
+
+    def run(self, directory, options):
+        size = (User.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+        edges = follow_graph.write_csr(
+            directory, follow_graph.FOLLOWS, self.edges('user', 'author'),
+            size,
+        )
+        follow_graph.write_csr(
+            directory, follow_graph.FOLLOWERS, self.edges('author', 'user'),
+            size,
+        )
+        tasks = [
+            (start, min(start + CHUNK_SIZE, size),
+             options['limit'], options['max_fanout'])
+            for start in range(0, size, CHUNK_SIZE)
+        ]
+        workers = max(options['workers'], 1)
+        # Считаем всё до транзакции: в SQLite она держит блокировку
+        # записи, и пользователи не смогли бы ничего сохранить.
+        if workers > 1:
+            with multiprocessing.Pool(
+                workers, follow_graph.open_snapshot, (directory,)
+            ) as pool:
+                rows = self.suggestions(
+                    pool.imap(follow_graph.run_range, tasks)
+                )
+        else:
+            follow_graph.open_snapshot(directory)
+            rows = self.suggestions(map(follow_graph.run_range, tasks))
+        with transaction.atomic():
+            FollowSuggestion.objects.all().delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+        self.stdout.write(
+            f'Подписок в графе: {edges}, предложений: {len(rows)}'
+        )
+
+    def edges(self, node, neighbour):
+        return Follow.objects.order_by(node, neighbour).values_list(
+            f'{node}_id', f'{neighbour}_id'
+        ).iterator()
+
+    def suggestions(self, chunks):
+        return [
+            FollowSuggestion(user_id=user, author_id=author, score=score)
+            for rows in chunks
+            for user, author, score in rows
+        ]
@@ -0,0 +1,55 @@
+from array import array
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, RelatedPost
+from posts.related import related_rows
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие посты по TF-IDF векторам текстов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=5,
+            help='Сколько похожих постов хранить на пост.',
+        )
+        parser.add_argument('--block-size', type=int, default=1000)
+        parser.add_argument(
+            '--max-df', type=float, default=0.1,
+            help='Слова, которые есть у большей доли постов, не учитываются.',
+        )
+        parser.add_argument(
+            '--min-score', type=float, default=0.05,
+            help='Менее близкие посты похожими не считаются.',
+        )
+
+    def handle(self, *args, **options):
+        ids = array('q')
+        texts = []
+        for pk, text in Post.objects.order_by('pk').values_list(
+            'pk', 'text'
+        ).iterator():
+            ids.append(pk)
+            texts.append(text)
+        # Векторы и соседи считаются до транзакции, чтобы не держать
+        # блокировку записи SQLite всё это время.
+        related = [
+            RelatedPost(
+                post_id=ids[position],
+                related_post_id=ids[other],
+                score=score,
+            )
+            for rows in related_rows(
+                texts, options['limit'], options['block_size'],
+                options['max_df'], options['min_score'],
+            )
+            for position, other, score in rows
+        ]
+        with transaction.atomic():
+            RelatedPost.objects.all().delete()
+            RelatedPost.objects.bulk_create(
+                related, batch_size=options['block_size']
+            )
+        self.stdout.write(f'Постов: {len(ids)}, похожих пар: {len(related)}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает список популярных постов. Запускается по cron, '
+        'например раз в 5 минут.'
+    )
+
+    def handle(self, *args, **options):
+        count = update_trending()
+        self.stdout.write(f'Популярных постов: {count}')
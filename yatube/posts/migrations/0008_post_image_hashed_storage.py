@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:08
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_auto_20220719_1818'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.HashedMediaStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+    ]
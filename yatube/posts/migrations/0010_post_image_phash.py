@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_duplicate_of',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='image_duplicates', to='posts.Post', verbose_name='Похожая картинка уже есть в посте'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Дата публикации')),
+                ('signature', models.BinaryField(verbose_name='Подпись')),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='posts.Comment')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='posts.Post')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток текста',
+                'verbose_name_plural': 'Отпечатки текстов',
+            },
+        ),
+        migrations.CreateModel(
+            name='LSHBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Полоса')),
+                ('bucket', models.BigIntegerField(verbose_name='Хэш полосы')),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='posts.TextFingerprint')),
+            ],
+            options={
+                'verbose_name': 'Полоса отпечатка',
+                'verbose_name_plural': 'Полосы отпечатков',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='textfingerprint',
+            index=models.Index(fields=['created'], name='posts_textf_created_0f56b8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lshbucket',
+            index=models.Index(fields=['band', 'bucket'], name='posts_lshbu_band_a0ebc8_idx'),
+        ),
+    ]
@@ -1,9 +1,16 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import SuspiciousFileOperation
 from django.db import models
+from django.utils import timezone
+
+from .duplicates import image_hash_index
+from .images import image_metadata
+from .storage import HashedMediaStorage
 
 User = get_user_model()
 
 LENGTH_TEXT_STR: int = 15
+IMAGE_DISPLAY_WIDTH: int = 960
 
 
 class Group(models.Model):
@@ -38,8 +45,28 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=HashedMediaStorage(),
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    image_placeholder = models.TextField(blank=True, editable=False)
+    image_phash = models.BigIntegerField(
+        null=True, blank=True, editable=False
+    )
+    image_duplicate_of = models.ForeignKey(
+        'self',
+        verbose_name='Похожая картинка уже есть в посте',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='image_duplicates',
+    )
 
     class Meta:
         ordering = ("-pub_date",)
@@ -47,6 +74,62 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:LENGTH_TEXT_STR]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        post._loaded_image = post.__dict__.get('image')
+        return post
+
+    def save(self, *args, **kwargs):
+        image_changed = 'image' not in self.get_deferred_fields() and (
+            self.image.name != getattr(self, '_loaded_image', None)
+        )
+        if image_changed:
+            self.update_image_metadata()
+        super().save(*args, **kwargs)
+        self._loaded_image = self.image.name
+        if image_changed:
+            image_hash_index.add(self.pk, self.image_phash)
+
+    @property
+    def image_display_height(self):
+        """Высота картинки шириной IMAGE_DISPLAY_WIDTH без чтения файла."""
+        if not self.image_width or not self.image_height:
+            return None
+        return round(
+            IMAGE_DISPLAY_WIDTH * self.image_height / self.image_width
+        )
+
+    def update_image_metadata(self):
+        """Запоминает размеры и заглушку картинки при её загрузке,
+        чтобы не открывать файл при выводе страниц, и отмечает пост,
+        если похожая картинка уже есть в другом посте."""
+        self.image_width = self.image_height = self.image_phash = None
+        self.image_placeholder = ''
+        self.image_duplicate_of_id = None
+        if not self.image:
+            return
+        # PostForm уже посчитал метаданные загруженной картинки.
+        known = self.__dict__.pop('known_image_metadata', None)
+        try:
+            (
+                self.image_width,
+                self.image_height,
+                self.image_placeholder,
+                self.image_phash,
+            ) = known or image_metadata(self.image)
+        except (OSError, SyntaxError, ValueError, SuspiciousFileOperation):
+            # Файла нет или это не картинка - выводим пост без заглушки.
+            pass
+        finally:
+            # Уже сохранённый файл мы открыли сами, а загруженный ещё
+            # понадобится при сохранении поста.
+            if self.image._committed:
+                self.image.close()
+        if self.image_phash is not None:
+            duplicates = image_hash_index.find(self.image_phash, self.pk)
+            self.image_duplicate_of_id = duplicates[0] if duplicates else None
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -97,3 +180,181 @@ class Follow(models.Model):
         ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class Tag(models.Model):
+    name = models.CharField('Хэштег', max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = 'Хэштег'
+        verbose_name_plural = 'Хэштеги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class TextLink(models.Model):
+    """Ссылка из текста поста или комментария (comment заполнен)."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    comment = models.ForeignKey(
+        Comment, on_delete=models.CASCADE, null=True, blank=True
+    )
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        abstract = True
+
+
+class TagLink(TextLink):
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name='links'
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=['tag', '-created', '-id'])]
+        verbose_name = 'Хэштег в тексте'
+        verbose_name_plural = 'Хэштеги в текстах'
+
+
+class Mention(TextLink):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='mentions',
+        verbose_name='Кого упомянули',
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created', '-id'])]
+        verbose_name = 'Упоминание'
+        verbose_name_plural = 'Упоминания'
+
+
+class TrendingPost(models.Model):
+    """Место поста в списке популярных, который пишет update_trending."""
+
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE, related_name='trending'
+    )
+    rank = models.PositiveIntegerField('Место', unique=True)
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ['rank']
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+
+
+class FollowSuggestion(models.Model):
+    """На кого подписаться; список пишет update_follow_suggestions."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Кому предложено',
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Предложенный автор',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ['-score', 'author']
+        indexes = [models.Index(fields=['user', '-score'])]
+        verbose_name = 'Предложение подписки'
+        verbose_name_plural = 'Предложения подписок'
+
+
+class RelatedPost(models.Model):
+    """Похожий пост; список пишет update_related_posts."""
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='related'
+    )
+    related_post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='+'
+    )
+    score = models.FloatField('Близость')
+
+    class Meta:
+        ordering = ['-score', 'related_post']
+        indexes = [models.Index(fields=['post', '-score'])]
+        verbose_name = 'Похожий пост'
+        verbose_name_plural = 'Похожие посты'
+
+
+class TextFingerprint(TextLink):
+    """MinHash-подпись текста поста или комментария."""
+
+    signature = models.BinaryField('Подпись')
+
+    class Meta:
+        indexes = [models.Index(fields=['created'])]
+        verbose_name = 'Отпечаток текста'
+        verbose_name_plural = 'Отпечатки текстов'
+
+
+class LSHBucket(models.Model):
+    """Хэш одной полосы подписи; по нему ищутся похожие тексты."""
+
+    fingerprint = models.ForeignKey(
+        TextFingerprint, on_delete=models.CASCADE, related_name='buckets'
+    )
+    band = models.PositiveSmallIntegerField('Полоса')
+    bucket = models.BigIntegerField('Хэш полосы')
+
+    class Meta:
+        indexes = [models.Index(fields=['band', 'bucket'])]
+        verbose_name = 'Полоса отпечатка'
+        verbose_name_plural = 'Полосы отпечатков'
+
+
+class Notification(models.Model):
+    POST = 'post'
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    KINDS = (
+        (POST, 'Новый пост'),
+        (COMMENT, 'Комментарий к посту'),
+        (FOLLOW, 'Новый подписчик'),
+    )
+
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    kind = models.CharField('Тип', max_length=16, choices=KINDS)
+    actor = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='От кого',
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, null=True, blank=True
+    )
+    comment = models.ForeignKey(
+        Comment, on_delete=models.CASCADE, null=True, blank=True
+    )
+    created = models.DateTimeField('Дата', default=timezone.now)
+    is_read = models.BooleanField('Прочитано', default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['recipient', '-created', '-id'])]
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+
+class UnreadCounter(models.Model):
+    """Число непрочитанных уведомлений, чтобы не считать их COUNT."""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='unread_counter',
+    )
+    count = models.PositiveIntegerField('Непрочитанных', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик уведомлений'
+        verbose_name_plural = 'Счётчики уведомлений'
@@ -0,0 +1,158 @@
+"""Уведомления подписчикам и авторам.
+
+Сигналы только ставят задачу после коммита транзакции, а уведомления
+пишет фоновый поток, поэтому время публикации не зависит от числа
+подписчиков автора. Получатели читаются потоком и пишутся пачками по
+NOTIFICATIONS_BATCH_SIZE: bulk_create уведомлений и один UPDATE
+счётчиков непрочитанного на пачку. Шапка сайта берёт число
+непрочитанных из UnreadCounter по первичному ключу, без COUNT; точным
+счётчик становится при открытии списка уведомлений.
+
+При NOTIFICATIONS_ASYNC = False задачи выполняются сразу после коммита
+в том же потоке (так удобнее в тестах).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+
+from .models import Comment, Follow, Notification, Post, UnreadCounter
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """Пул из одного потока; после fork в дочернем процессе - новый."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='notifications'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run_task(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('Не удалось разослать уведомления')
+    finally:
+        # У фонового потока свои соединения, закрываем их сами.
+        connections.close_all()
+
+
+def in_memory_db():
+    connection = connections[DEFAULT_DB_ALIAS]
+    return connection.vendor == 'sqlite' and connection.is_in_memory_db()
+
+
+def schedule(function, *args):
+    """Выполняет function(*args) после коммита текущей транзакции."""
+    def submit():
+        if not settings.NOTIFICATIONS_ASYNC:
+            function(*args)
+            return
+        future = executor().submit(run_task, function, *args)
+        if in_memory_db():
+            # В SQLite в памяти (тестовая база) второй пишущий поток
+            # сразу получает "database table is locked", а не ждёт.
+            future.result()
+
+    transaction.on_commit(submit)
+
+
+def deliver(recipient_ids, kind, actor_id, post_id=None, comment_id=None):
+    """Пишет уведомления пачками и увеличивает счётчики получателей."""
+    recipient_ids = iter(recipient_ids)
+    batch_size = settings.NOTIFICATIONS_BATCH_SIZE
+    total = 0
+    while True:
+        batch = list(islice(recipient_ids, batch_size))
+        if not batch:
+            return total
+        with transaction.atomic():
+            Notification.objects.bulk_create(
+                [
+                    Notification(
+                        recipient_id=recipient_id, kind=kind,
+                        actor_id=actor_id, post_id=post_id,
+                        comment_id=comment_id,
+                    )
+                    for recipient_id in batch
+                ],
+                batch_size=batch_size,
+            )
+            UnreadCounter.objects.bulk_create(
+                [UnreadCounter(user_id=user_id) for user_id in batch],
+                batch_size=batch_size, ignore_conflicts=True,
+            )
+            UnreadCounter.objects.filter(user_id__in=batch).update(
+                count=F('count') + 1
+            )
+        total += len(batch)
+
+
+def notify_followers(post_id):
+    post = Post.objects.filter(pk=post_id).values('author_id').first()
+    if post is None:
+        return 0
+    author_id = post['author_id']
+    followers = Follow.objects.filter(author_id=author_id).exclude(
+        user_id=author_id
+    ).order_by('pk').values_list('user_id', flat=True).iterator()
+    return deliver(followers, Notification.POST, author_id, post_id=post_id)
+
+
+def notify_post_author(comment_id):
+    comment = Comment.objects.filter(pk=comment_id).values(
+        'author_id', 'post_id', 'post__author_id'
+    ).first()
+    if comment is None or comment['author_id'] == comment['post__author_id']:
+        return 0
+    return deliver(
+        [comment['post__author_id']], Notification.COMMENT,
+        comment['author_id'], post_id=comment['post_id'],
+        comment_id=comment_id,
+    )
+
+
+def notify_followed(user_id, author_id):
+    if user_id == author_id:
+        return 0
+    return deliver([author_id], Notification.FOLLOW, user_id)
+
+
+def mark_read(user):
+    """Отмечает все уведомления прочитанными и выравнивает счётчик.
+
+    Счётчик не уменьшается, когда уведомление удаляется каскадом вместе
+    с постом или пользователем, поэтому здесь он не уменьшается на
+    число отмеченных, а заново выставляется по оставшимся непрочитанным.
+    """
+    with transaction.atomic():
+        count = Notification.objects.filter(
+            recipient=user, is_read=False
+        ).update(is_read=True)
+        UnreadCounter.objects.filter(user=user).update(
+            count=Notification.objects.filter(
+                recipient=user, is_read=False
+            ).count()
+        )
+    return count
+
+
+def unread_count(user):
+    return UnreadCounter.objects.filter(user=user).values_list(
+        'count', flat=True
+    ).first() or 0
@@ -0,0 +1,108 @@
+"""Похожие посты для страницы поста.
+
+Команда update_related_posts переводит тексты всех постов в разреженные
+TF-IDF векторы: основы слов (как в поиске) хэшируются в N_FEATURES
+признаков, поэтому словарь не нужен. Косинусная близость считается по
+инвертированному индексу признак -> (пост, вес) пачками по block_size
+постов. Поиск соседей приближённый: признаки, которые есть больше чем у
+max_df доли постов, в индекс не попадают, в списке признака остаются
+MAX_POSTINGS постов, где у него самый большой вес, а у каждого поста
+ищется только по QUERY_TERMS самым весомым признакам. Так время на пост
+не зависит от размера базы. Лучшие соседи записываются в RelatedPost,
+и страница поста читает их одним запросом.
+"""
+import heapq
+import math
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from .search import WORD_RE, normalize, stem
+
+N_FEATURES: int = 2 ** 20
+MIN_WORD: int = 3
+MAX_POSTINGS: int = 100
+QUERY_TERMS: int = 10
+
+
+@lru_cache(maxsize=2 ** 16)
+def feature(word):
+    return zlib.crc32(stem(word).encode()) % N_FEATURES
+
+
+def features(text):
+    """Хэшированные основы слов текста с числом повторов."""
+    words = WORD_RE.findall(normalize(text).lower())
+    return Counter(feature(word) for word in words if len(word) >= MIN_WORD)
+
+
+def tfidf_vectors(texts):
+    """Нормированные TF-IDF векторы (признаки, веса) для всех текстов."""
+    counts = [features(text) for text in texts]
+    df = Counter()
+    for count in counts:
+        df.update(count.keys())
+    total = len(counts)
+    vectors = []
+    for count in counts:
+        weights = {
+            feature: (
+                (1 + math.log(tf)) * math.log((1 + total) / (1 + df[feature]))
+            )
+            for feature, tf in count.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        items = sorted(weights.items()) if norm else []
+        vectors.append((
+            array('i', [feature for feature, _ in items]),
+            array('d', [weight / norm for _, weight in items]),
+        ))
+    return vectors, df
+
+
+def inverted_index(vectors, df, max_df):
+    """Признак -> MAX_POSTINGS самых весомых (вес, номер текста)."""
+    limit = max(max_df * len(vectors), MAX_POSTINGS)
+    index = {}
+    for position, (feature_ids, weights) in enumerate(vectors):
+        for feature, weight in zip(feature_ids, weights):
+            if df[feature] > limit:
+                continue
+            postings = index.setdefault(feature, [])
+            if len(postings) < MAX_POSTINGS:
+                heapq.heappush(postings, (weight, position))
+            elif weight > postings[0][0]:
+                heapq.heapreplace(postings, (weight, position))
+    return index
+
+
+def nearest(vectors, index, start, stop, limit, min_score):
+    """Для векторов [start, stop): список (номер, номер соседа, близость)."""
+    rows = []
+    for position in range(start, stop):
+        scores = {}
+        feature_ids, weights = vectors[position]
+        terms = heapq.nlargest(QUERY_TERMS, zip(weights, feature_ids))
+        for weight, feature in terms:
+            for other_weight, other in index.get(feature, ()):
+                scores[other] = scores.get(other, 0) + weight * other_weight
+        scores.pop(position, None)
+        top = heapq.nlargest(limit, scores, key=scores.__getitem__)
+        rows.extend(
+            (position, other, scores[other]) for other in top
+            if scores[other] >= min_score
+        )
+    return rows
+
+
+def related_rows(texts, limit=5, block_size=1000, max_df=0.1,
+                 min_score=0.05):
+    """Пачки соседей по номерам текстов, по пачке на block_size текстов."""
+    vectors, df = tfidf_vectors(texts)
+    index = inverted_index(vectors, df, max_df)
+    for start in range(0, len(vectors), block_size):
+        yield nearest(
+            vectors, index, start, min(start + block_size, len(vectors)),
+            limit, min_score,
+        )
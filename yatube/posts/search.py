@@ -0,0 +1,169 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Тексты постов лежат в виртуальной таблице posts_post_fts с rowid, равным
+id поста. Таблица обновляется сигналами при сохранении и удалении поста
+и целиком перестраивается командой rebuild_search_index (seed и другие
+bulk-операции сигналов не шлют). Ранжирование - BM25, выдача
+постраничная по курсору (ранг, id), поэтому дальние страницы не
+дороже первой.
+
+Стеммера для русского в FTS5 нет, поэтому слова запроса обрезаются до
+основы по списку типичных окончаний и ищутся как префиксы: «котиков»
+находит «котик», «котика» и «котики». Для префиксов построены индексы
+prefix='2 3'. Буква «ё» при индексации и в запросе заменяется на «е».
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+MAX_TERMS: int = 10
+MIN_STEM: int = 3
+WORD_RE = re.compile(r'\w+')
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ах', 'ях', 'ов', 'ев', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое',
+    'ее', 'ые', 'ие', 'ом', 'ем', 'ам', 'ям', 'ую', 'юю', 'ть', 'ла',
+    'ло', 'ли', 'ет', 'ит', 'ут', 'ют', 'ат', 'ят',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def stem(word):
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе MATCH: все слова как префиксы."""
+    words = WORD_RE.findall(normalize(query).lower())[:MAX_TERMS]
+    return ' '.join(f'"{stem(word)}"*' for word in words)
+
+
+def index_post(post):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, normalize(post.text)],
+        )
+
+
+def unindex_post(pk):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index():
+    """Перестраивает индекс одной транзакцией и возвращает число постов.
+
+    Всё копирование идёт внутри SQLite, без передачи текстов в Python.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') "
+            'FROM posts_post'
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+        )
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def filter_matching(posts, query):
+    """Посты из posts, подходящие под запрос, без ранжирования."""
+    expression = match_expression(query)
+    if not expression:
+        return posts.none()
+    return posts.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [expression],
+    ))
+
+
+def encode_cursor(rank, pk):
+    return f'{rank!r}_{pk}'
+
+
+def decode_cursor(value):
+    """(ранг, id) из параметра after; ValueError, если он испорчен."""
+    rank, pk = value.rsplit('_', 1)
+    return float(rank), int(pk)
+
+
+def search_post_ids(query, group=None, author=None, after=None, limit=10):
+    """id найденных постов по убыванию релевантности и курсор дальше.
+
+    Курсор - ранг и id последнего поста страницы; None, если это была
+    последняя страница.
+    """
+    if not search_available():
+        return search_post_ids_like(query, group, author, after, limit)
+    expression = match_expression(query)
+    if not expression:
+        return [], None
+    sql = [
+        f'SELECT f.rowid, f.rank FROM {FTS_TABLE} f '
+        'JOIN posts_post p ON p.id = f.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s'
+    ]
+    params = [expression]
+    if group is not None:
+        sql.append('AND p.group_id = %s')
+        params.append(group.pk)
+    if author is not None:
+        sql.append('AND p.author_id = %s')
+        params.append(author.pk)
+    if after is not None:
+        sql.append('AND (f.rank > %s OR (f.rank = %s AND f.rowid > %s))')
+        params.extend([after[0], after[0], after[1]])
+    sql.append('ORDER BY f.rank, f.rowid LIMIT %s')
+    params.append(limit + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return [pk for pk, _ in rows], next_cursor
+
+
+def search_post_ids_like(query, group, author, after, limit):
+    """Запасной поиск для баз без FTS5: подстрока, новые посты первыми."""
+    if not query.strip():
+        return [], None
+    posts = Post.objects.filter(text__icontains=query).order_by('-pk')
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    if after is not None:
+        posts = posts.filter(pk__lt=after[1])
+    ids = list(posts.values_list('pk', flat=True)[:limit + 1])
+    if len(ids) > limit:
+        ids = ids[:limit]
+        return ids, encode_cursor(0.0, ids[-1])
+    return ids, None
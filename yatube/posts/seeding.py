@@ -0,0 +1,119 @@
+"""Генерация синтетических данных для команды seed.
+
+Модуль не импортирует модели: функции выполняются в процессах-воркерах
+и возвращают кортежи, которые основной процесс пишет в базу через
+bulk_create. Каждая порция данных получает свой seed, поэтому результат
+зависит только от общего seed, но не от числа воркеров.
+"""
+import random
+
+from faker import Faker
+
+FAKER_LOCALE = 'ru_RU'
+SEED_PASSWORD = 'seed-password'
+MAX_FOLLOWS_PER_USER: int = 500
+
+
+def run_chunk(task):
+    function, args = task
+    return function(*args)
+
+
+def power_law_index(rng, size):
+    """Индекс от 0 до size - 1, где индекс i выпадает с частотой ~ 1/(i+1).
+
+    Так распределены популярность авторов и активность пользователей:
+    немногие получают почти всё, у большинства - единицы.
+    """
+    return min(int(size ** rng.random()) - 1, size - 1)
+
+
+def make_rng(seed, kind, chunk):
+    rng = random.Random(f'{seed}:{kind}:{chunk}')
+    fake = Faker(FAKER_LOCALE)
+    fake.seed_instance(rng.getrandbits(32))
+    return rng, fake
+
+
+def generate_users(seed, chunk, start, count):
+    _, fake = make_rng(seed, 'users', chunk)
+    return [
+        (
+            f'{fake.user_name()}_{index}',
+            fake.first_name(),
+            fake.last_name(),
+            f'user{index}@example.com',
+        )
+        for index in range(start, start + count)
+    ]
+
+
+def generate_groups(seed, chunk, start, count):
+    _, fake = make_rng(seed, 'groups', chunk)
+    return [
+        (
+            fake.sentence(nb_words=3).rstrip('.'),
+            f'group-{index}',
+            fake.paragraph(nb_sentences=2),
+        )
+        for index in range(start, start + count)
+    ]
+
+
+def generate_posts(seed, chunk, start, count, users, groups, seconds):
+    """(автор, группа или None, текст, возраст поста в секундах)."""
+    rng, fake = make_rng(seed, 'posts', chunk)
+    return [
+        (
+            power_law_index(rng, users),
+            rng.randrange(groups) if groups and rng.random() < 0.6 else None,
+            fake.paragraph(nb_sentences=rng.randint(1, 8)),
+            rng.randrange(seconds),
+        )
+        for _ in range(count)
+    ]
+
+
+def generate_comments(seed, chunk, start, count, users, posts, seconds):
+    """(пост, автор, текст, возраст комментария в секундах).
+
+    Комментируют в основном популярные посты; новые посты в базе идут
+    первыми по индексу, поэтому им и достаётся больше комментариев.
+    """
+    rng, fake = make_rng(seed, 'comments', chunk)
+    return [
+        (
+            power_law_index(rng, posts),
+            rng.randrange(users),
+            fake.sentence(nb_words=rng.randint(3, 20)),
+            rng.randrange(seconds),
+        )
+        for _ in range(count)
+    ]
+
+
+def generate_follows(seed, chunk, start, count, users, follows_per_user):
+    """(подписчик, автор) для пользователей start..start + count - 1.
+
+    Число подписок у пользователя распределено по Парето со средним
+    около follows_per_user, авторы выбираются по степенному закону.
+    """
+    rng, _ = make_rng(seed, 'follows', chunk)
+    alpha = 2.0
+    scale = follows_per_user * (alpha - 1) / alpha
+    rows = []
+    for user in range(start, start + count):
+        wanted = min(
+            int(scale * rng.paretovariate(alpha)),
+            MAX_FOLLOWS_PER_USER,
+            users - 1,
+        )
+        authors = set()
+        for _ in range(wanted * 3):
+            if len(authors) >= wanted:
+                break
+            author = power_law_index(rng, users)
+            if author != user:
+                authors.add(author)
+        rows.extend((user, author) for author in sorted(authors))
+    return rows
@@ -0,0 +1,79 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .autocomplete import GROUP, USER, autocomplete_index
+from .fingerprints import remember_comment, remember_post
+from .links import update_comment_links, update_post_links
+from .models import Comment, Follow, Group, Post, User
+from .notifications import (
+    notify_followed, notify_followers, notify_post_author, schedule,
+)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def link_saved_post(sender, instance, created, **kwargs):
+    update_post_links(instance, new=created)
+
+
+@receiver(post_save, sender=Comment)
+def link_saved_comment(sender, instance, created, **kwargs):
+    update_comment_links(instance, new=created)
+
+
+@receiver(post_save, sender=Post)
+def fingerprint_saved_post(sender, instance, created, **kwargs):
+    remember_post(instance, new=created)
+
+
+@receiver(post_save, sender=Comment)
+def fingerprint_saved_comment(sender, instance, created, **kwargs):
+    remember_comment(instance, new=created)
+
+
+@receiver(post_save, sender=Post)
+def notify_about_post(sender, instance, created, **kwargs):
+    if created:
+        schedule(notify_followers, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def notify_about_comment(sender, instance, created, **kwargs):
+    if created:
+        schedule(notify_post_author, instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def notify_about_follow(sender, instance, created, **kwargs):
+    if created:
+        schedule(notify_followed, instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def autocomplete_saved_user(sender, instance, **kwargs):
+    autocomplete_index.update(USER, instance)
+
+
+@receiver(post_save, sender=Group)
+def autocomplete_saved_group(sender, instance, **kwargs):
+    autocomplete_index.update(GROUP, instance)
+
+
+@receiver(post_delete, sender=User)
+def autocomplete_deleted_user(sender, instance, **kwargs):
+    autocomplete_index.remove(USER, instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def autocomplete_deleted_group(sender, instance, **kwargs):
+    autocomplete_index.remove(GROUP, instance.pk)
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE: int = 64 * 1024
+FANOUT_DEPTH: int = 2
+FANOUT_WIDTH: int = 2
+HASHED_NAME_RE = re.compile(
+    r'(?:^|/)(?:[0-9a-f]{%d}/){%d}(?P<digest>[0-9a-f]{64})(?:\.\w+)?$'
+    % (FANOUT_WIDTH, FANOUT_DEPTH)
+)
+
+
+def content_digest(content):
+    """Считает sha256 содержимого файла, читая его порциями."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    """posts/cat.jpg -> posts/ab/cd/abcd...ef.jpg"""
+    directory = os.path.dirname(name)
+    ext = os.path.splitext(name)[1].lower()
+    fanout = [
+        digest[i * FANOUT_WIDTH:(i + 1) * FANOUT_WIDTH]
+        for i in range(FANOUT_DEPTH)
+    ]
+    return '/'.join(
+        part for part in (directory, *fanout, digest + ext) if part
+    )
+
+
+def is_hashed_name(name):
+    return bool(name) and HASHED_NAME_RE.search(name) is not None
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """Хранилище, адресующее файлы по содержимому.
+
+    Имя файла - sha256 содержимого, файлы раскладываются по вложенным
+    каталогам по префиксу хэша, чтобы ни в одном каталоге не копились
+    миллионы записей. Повторная загрузка того же содержимого
+    возвращает уже существующий файл, а не создаёт копию, и обновляет
+    его mtime.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(name, content_digest(content))
+        if self.exists(name):
+            # gc_media не трогает файлы моложе --grace, поэтому
+            # переиспользованный файл «омолаживаем».
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        # Пишем во временный файл и атомарно переименовываем: параллельная
+        # загрузка того же содержимого не увидит недописанный файл.
+        tmp_name = '%s.%s.tmp' % (name, uuid.uuid4().hex)
+        tmp_name = super()._save(tmp_name, content)
+        os.replace(self.path(tmp_name), self.path(name))
+        return name
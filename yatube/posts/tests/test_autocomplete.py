@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..autocomplete import autocomplete_index
+from ..models import Group
+
+User = get_user_model()
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='ivan_k', first_name='Иван', last_name='Кузнецов'
+        )
+        User.objects.create_user(username='ivanova')
+        cls.group = Group.objects.create(
+            title='Ёжики и котики', slug='hedgehogs', description='-'
+        )
+
+    def setUp(self):
+        autocomplete_index.clear()
+
+    def labels(self, query):
+        return [label for _, label, _ in autocomplete_index.search(query)]
+
+    def test_prefix_search(self):
+        """Находит по нику, имени, фамилии и словам названия группы."""
+        self.assertEqual(
+            self.labels('iv'), ['Иван Кузнецов (ivan_k)', 'ivanova']
+        )
+        self.assertEqual(self.labels('кузн'), ['Иван Кузнецов (ivan_k)'])
+        self.assertEqual(self.labels('КОТ'), ['Ёжики и котики'])
+        self.assertEqual(self.labels('ежик'), ['Ёжики и котики'])
+        self.assertEqual(self.labels('   '), [])
+
+    def test_index_follows_changes(self):
+        self.labels('x')
+        user = User.objects.get(pk=self.user.pk)
+        user.last_name = 'Смирнов'
+        user.save()
+        self.assertEqual(self.labels('кузн'), [])
+        self.assertEqual(self.labels('смир'), ['Иван Смирнов (ivan_k)'])
+        Group.objects.get(pk=self.group.pk).delete()
+        self.assertEqual(self.labels('кот'), [])
+        Group.objects.create(title='Котлеты', slug='food', description='-')
+        self.assertEqual(self.labels('кот'), ['Котлеты'])
+
+    def test_refresh_keeps_concurrent_changes(self):
+        """Изменения во время перестройки не теряются после неё."""
+        self.labels('x')
+        snapshot = autocomplete_index._load
+
+        def load_while_saving():
+            loaded = snapshot()
+            user = User.objects.get(pk=self.user.pk)
+            user.last_name = 'Смирнов'
+            user.save()
+            Group.objects.get(pk=self.group.pk).delete()
+            return loaded
+
+        autocomplete_index.pending = []
+        with mock.patch.object(
+            autocomplete_index, '_load', load_while_saving
+        ):
+            with mock.patch('posts.indexes.connections') as connections:
+                autocomplete_index._refresh()
+        connections.close_all.assert_called_once_with()
+        self.assertIsNone(autocomplete_index.pending)
+        self.assertEqual(self.labels('смир'), ['Иван Смирнов (ivan_k)'])
+        self.assertEqual(self.labels('кузн'), [])
+        self.assertEqual(self.labels('кот'), [])
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('posts:autocomplete'), {'q': 'еж'})
+        self.assertEqual(response.json(), {'results': [{
+            'type': 'group',
+            'label': 'Ёжики и котики',
+            'url': reverse('posts:group_list', args=('hedgehogs',)),
+        }]})
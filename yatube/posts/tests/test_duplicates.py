@@ -0,0 +1,173 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageDraw
+
+from uploads.models import Upload
+
+from .. import models
+from ..duplicates import MultiIndexHashTable, image_hash_index
+from ..images import image_metadata, perceptual_hash
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(size=(64, 48), shift=0):
+    image = Image.new('RGB', size, color=(255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    draw.rectangle(
+        (width // 4 + shift, height // 4, width // 2, height - 5),
+        fill=(0, 0, 0)
+    )
+    draw.ellipse((width // 2, 0, width - 1, height // 2), fill=(255, 0, 0))
+    return image
+
+
+def make_upload(image, name='image.png'):
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class MultiIndexHashTableTests(TestCase):
+    def test_search_by_hamming_distance(self):
+        """Находятся только хэши на расстоянии не больше заданного."""
+        table = MultiIndexHashTable(max_distance=3)
+        table.add(1, 0)
+        table.add(2, 0b111)
+        table.add(3, 0b1111)
+        table.add(4, -1)
+        self.assertEqual(table.search(0), {1, 2})
+        table.remove(2)
+        self.assertEqual(table.search(0), {1})
+        self.assertEqual(table.search(-1 ^ 1), {4})
+
+    def test_phash_survives_resize(self):
+        """Уменьшенная копия картинки даёт почти тот же pHash."""
+        table = MultiIndexHashTable(max_distance=4)
+        table.add(1, perceptual_hash(make_image((640, 480))))
+        self.assertEqual(
+            table.search(perceptual_hash(make_image((320, 240)))), {1}
+        )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    UPLOADS_STAGING_ROOT=os.path.join(TEMP_MEDIA_ROOT, 'staging'),
+)
+class ImageDuplicateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляем тестовые медиа."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        image_hash_index.clear()
+        self.original = Post.objects.create(
+            author=self.user,
+            text='Оригинал',
+            image=make_upload(make_image((640, 480))),
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_near_duplicate_is_flagged(self):
+        """Пост с похожей картинкой отмечается как дубликат."""
+        copy = Post.objects.create(
+            author=self.user,
+            text='Копия',
+            image=make_upload(make_image((320, 240)), 'copy.png'),
+        )
+        self.assertEqual(copy.image_duplicate_of, self.original)
+
+    @override_settings(POSTS_REJECT_DUPLICATE_IMAGES=True)
+    def test_near_duplicate_is_rejected(self):
+        """Форма не принимает похожую картинку, если это включено."""
+        posts_count = Post.objects.count()
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {
+                'text': 'Копия',
+                'image': make_upload(make_image((320, 240)), 'copy.png'),
+            },
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Такая картинка уже есть на сайте'
+        )
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    @override_settings(POSTS_REJECT_DUPLICATE_IMAGES=True)
+    def test_near_duplicate_upload_is_rejected(self):
+        """Картинка, загруженная по частям, тоже проверяется."""
+        content = make_upload(make_image((320, 240))).read()
+        upload = Upload.objects.create(
+            user=self.user, filename='copy.png', size=len(content),
+            sha256='', offset=len(content), status=Upload.COMPLETE,
+        )
+        os.makedirs(os.path.dirname(upload.staging_path), exist_ok=True)
+        with open(upload.staging_path, 'wb') as staging:
+            staging.write(content)
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Копия', 'upload': str(upload.pk)},
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Такая картинка уже есть на сайте'
+        )
+
+    def test_metadata_computed_once_per_upload(self):
+        """pHash загруженной через форму картинки считается один раз."""
+        with mock.patch(
+            'posts.forms.image_metadata', wraps=image_metadata
+        ) as form_metadata, mock.patch.object(
+            models, 'image_metadata', wraps=image_metadata
+        ) as model_metadata:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                {'text': 'Новый', 'image': make_upload(make_image((9, 9)))},
+            )
+        post = Post.objects.get(text='Новый')
+        self.assertEqual((post.image_width, post.image_height), (9, 9))
+        self.assertEqual(form_metadata.call_count, 1)
+        self.assertEqual(model_metadata.call_count, 0)
+
+    def test_refresh_sees_other_processes(self):
+        """Перестройка индекса видит чужие посты и не теряет свои."""
+        other = Post.objects.create(author=self.user, text='Чужой')
+        phash = perceptual_hash(make_image((640, 480), shift=20))
+        # Так пост сохранил бы другой процесс: индекс этого о нём не знает.
+        Post.objects.filter(pk=other.pk).update(image_phash=phash)
+        self.assertEqual(image_hash_index.find(phash), [self.original.pk])
+        load = image_hash_index._load
+
+        def load_while_saving():
+            table = load()
+            image_hash_index.add(-1, phash)
+            return table
+
+        image_hash_index.pending = []
+        with mock.patch.object(image_hash_index, '_load', load_while_saving):
+            with mock.patch('posts.indexes.connections'):
+                image_hash_index._refresh()
+        self.assertIn(-1, image_hash_index.data.values)
+        self.assertEqual(
+            image_hash_index.find(phash), [self.original.pk, other.pk]
+        )
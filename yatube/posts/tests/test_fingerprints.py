@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..fingerprints import find_duplicate, normalize, prune, signature
+from ..models import Comment, LSHBucket, Post, TextFingerprint
+
+User = get_user_model()
+
+SPAM = (
+    'Только сегодня! Лучшие кредиты без справок и поручителей, '
+    'одобрение за пять минут, пишите в личные сообщения'
+)
+VARIED_SPAM = (
+    'Только сегодня!!! Лучшие кредиты без справок и поручителей, '
+    'одобрение за 5 минут, пишите в личные сообщения'
+)
+
+
+class FingerprintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bot = User.objects.create_user(username='bot')
+        cls.other_bot = User.objects.create_user(username='other_bot')
+        cls.post = Post.objects.create(author=cls.bot, text=SPAM)
+
+    def test_short_texts_are_skipped(self):
+        self.assertIsNone(signature(normalize('Спасибо!')))
+        comment = Comment.objects.create(
+            post=self.post, author=self.bot, text='Спасибо!'
+        )
+        self.assertFalse(
+            TextFingerprint.objects.filter(comment=comment).exists()
+        )
+
+    def test_min_length_is_not_cached(self):
+        """Кэш подписей не запоминает NEAR_DUPLICATE_MIN_LENGTH."""
+        text = normalize(SPAM)
+        self.assertIsNotNone(signature(text))
+        with override_settings(NEAR_DUPLICATE_MIN_LENGTH=len(text) + 1):
+            self.assertIsNone(signature(text))
+        with override_settings(NEAR_DUPLICATE_MIN_LENGTH=0):
+            self.assertIsNone(signature('+1'))
+
+    def test_near_duplicate_found(self):
+        self.assertEqual(LSHBucket.objects.count(), 16)
+        self.assertEqual(find_duplicate(VARIED_SPAM).post, self.post)
+        self.assertIsNone(find_duplicate(
+            'Совсем другой текст про котиков, которые спят на диване '
+            'весь день и не хотят просыпаться'
+        ))
+
+    def test_edit_is_not_own_duplicate(self):
+        own = Q(post=self.post, comment=None)
+        self.assertIsNone(find_duplicate(VARIED_SPAM, exclude=own))
+
+    def test_old_texts_expire(self):
+        TextFingerprint.objects.update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        self.assertIsNone(find_duplicate(VARIED_SPAM))
+        self.assertEqual(prune(), 1)
+        self.assertFalse(LSHBucket.objects.exists())
+
+    def test_forms_reject_near_duplicates(self):
+        self.client.force_login(self.other_bot)
+        posts = Post.objects.count()
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': VARIED_SPAM}
+        )
+        self.assertFormError(
+            response, 'form', 'text',
+            'Почти такой же текст недавно уже публиковали',
+        )
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': VARIED_SPAM},
+        )
+        self.assertTemplateUsed(response, 'posts/post_detail.html')
+        self.assertFormError(
+            response, 'form', 'text',
+            'Почти такой же текст недавно уже публиковали',
+        )
+        self.assertContains(
+            response, 'Почти такой же текст недавно уже публиковали'
+        )
+        self.assertEqual(Post.objects.count(), posts)
+        self.assertFalse(Comment.objects.exists())
+
+        self.client.force_login(self.bot)
+        response = self.client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': VARIED_SPAM},
+        )
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=(self.post.pk,))
+        )
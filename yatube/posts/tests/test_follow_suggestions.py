@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('me', 'friend', 'fof', 'twin', 'star', 'other')
+        }
+        for user, author in (
+            ('me', 'friend'),
+            ('friend', 'fof'),
+            ('twin', 'friend'),
+            ('twin', 'star'),
+            ('other', 'me'),
+        ):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def suggested(self, name):
+        return {
+            suggestion.author.username: suggestion.score
+            for suggestion in FollowSuggestion.objects.filter(
+                user=self.users[name]
+            )
+        }
+
+    def update(self, **options):
+        call_command(
+            'update_follow_suggestions', stdout=StringIO(), **options
+        )
+
+    def test_scores(self):
+        """Друг друга - +1, подписка соседа по общему автору - 1/2."""
+        self.update(workers=1)
+        self.assertEqual(self.suggested('me'), {'fof': 1.0, 'star': 0.5})
+        self.assertEqual(
+            self.suggested('other'), {'friend': 1.0}
+        )
+
+    def test_max_fanout_and_limit(self):
+        self.update(workers=1, max_fanout=1, limit=1)
+        self.assertEqual(self.suggested('me'), {'fof': 1.0})
+
+    def test_process_pool_gives_same_result(self):
+        self.update(workers=1)
+        single = list(FollowSuggestion.objects.values_list(
+            'user', 'author', 'score'
+        ))
+        self.update(workers=2)
+        self.assertEqual(
+            list(FollowSuggestion.objects.values_list(
+                'user', 'author', 'score'
+            )),
+            single,
+        )
+
+    def test_pages_show_suggestions(self):
+        self.update(workers=1)
+        self.client.force_login(self.users['me'])
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args=('me',)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    [s.author for s in response.context['suggestions']],
+                    [self.users['fof'], self.users['star']],
+                )
+        response = self.client.get(reverse('posts:profile', args=('twin',)))
+        self.assertNotIn('suggestions', response.context)
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..links import extract_mentions, extract_tags
+from ..models import Comment, Mention, Post, TagLink
+
+User = get_user_model()
+
+
+class LinksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Утро #Кофе и #завтрак, привет @reader.'
+        )
+
+    def tag_posts(self, name, **params):
+        response = self.client.get(reverse('posts:tag', args=(name,)), params)
+        return response, [link.post.pk for link in response.context['items']]
+
+    def test_extract(self):
+        self.assertEqual(
+            extract_tags('#Кот и #кот, a#b ##x #1'), {'кот', '1'}
+        )
+        self.assertEqual(
+            extract_mentions('@leo. mail@host @a.b @.'), {'leo', 'a.b'}
+        )
+
+    def test_links_follow_edits(self):
+        self.assertEqual(
+            set(TagLink.objects.values_list('tag__name', flat=True)),
+            {'кофе', 'завтрак'},
+        )
+        self.assertEqual(Mention.objects.get().user, self.reader)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Вечер #чай'
+        post.save()
+        self.assertEqual(
+            list(TagLink.objects.values_list('tag__name', flat=True)), ['чай']
+        )
+        self.assertFalse(Mention.objects.exists())
+
+    def test_comment_links(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Спасибо, @author #кофе'
+        )
+        mention = Mention.objects.get(user=self.author)
+        self.assertEqual(
+            (mention.post, mention.comment), (self.post, comment)
+        )
+        self.assertEqual(TagLink.objects.filter(tag__name='кофе').count(), 2)
+
+    def test_tag_page(self):
+        response, ids = self.tag_posts('КОФЕ')
+        self.assertEqual(ids, [self.post.pk])
+        self.assertContains(
+            response, f'<a href="{reverse("posts:tag", args=("кофе",))}">'
+        )
+        self.assertEqual(
+            self.client.get(reverse('posts:tag', args=('нет',))).status_code,
+            404,
+        )
+
+    def test_tag_cursor_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'#кофе номер {number}')
+            for number in range(14)
+        )
+        call_command('rebuild_links', stdout=StringIO())
+        first, first_ids = self.tag_posts('кофе')
+        second, second_ids = self.tag_posts(
+            'кофе', after=first.context['next_cursor']
+        )
+        self.assertEqual(len(first_ids), 10)
+        self.assertIsNone(second.context['next_cursor'])
+        self.assertFalse(set(first_ids) & set(second_ids))
+        self.assertEqual(len(first_ids) + len(second_ids), 15)
+        _, ids = self.tag_posts('кофе', after='испорчен')
+        self.assertEqual(ids, first_ids)
+
+    def test_mentions_page(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:mentions'))
+        self.assertEqual(
+            [link.post.pk for link in response.context['items']],
+            [self.post.pk],
+        )
+        self.client.logout()
+        response = self.client.get(reverse('posts:mentions'))
+        self.assertEqual(response.status_code, 302)
@@ -1,10 +1,19 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
 
 from .. models import Group, Post
 
 User = get_user_model()
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
 
 class PostModelTest(TestCase):
     """Создаем тестовый пост и группу."""
@@ -63,3 +72,32 @@ class GroupModelTest(TestCase):
         """Проверяем, что у моделей корректно работает __str__."""
         group = GroupModelTest.group
         self.assertEqual(str(group), group.title)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageMetadataTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляем тестовые медиа."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_image_metadata_saved_on_upload(self):
+        """При загрузке картинки сохраняются её размеры и заглушка."""
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20), color=(255, 0, 0)).save(buffer, 'PNG')
+        user = User.objects.create_user(username='leo')
+        post = Post.objects.create(
+            author=user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('red.png', buffer.getvalue()),
+        )
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/png;base64,')
+        )
+        post.image = ''
+        post.save()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_placeholder, '')
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Notification, Post, UnreadCounter
+from ..notifications import executor, unread_count
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, NOTIFICATIONS_BATCH_SIZE=2)
+class NotificationTests(TransactionTestCase):
+    def setUp(self):
+        """Автор и пять подписчиков."""
+        self.author = User.objects.create_user(username='author')
+        self.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(5)
+        ]
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+
+    def test_follow_notifies_author(self):
+        """Каждая подписка - уведомление автору."""
+        self.assertEqual(unread_count(self.author), 5)
+        self.assertEqual(
+            set(self.author.notifications.values_list('kind', flat=True)),
+            {Notification.FOLLOW},
+        )
+
+    def test_post_fans_out_to_followers_in_batches(self):
+        """Новый пост доходит до всех подписчиков, пачками по две."""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        for reader in self.readers:
+            notification = reader.notifications.get()
+            self.assertEqual(
+                (notification.kind, notification.post),
+                (Notification.POST, post),
+            )
+            self.assertEqual(unread_count(reader), 1)
+
+    def test_comment_notifies_post_author_only(self):
+        """Автора уведомляют о чужих комментариях, но не о своих."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.author, text='Сам себе')
+        Comment.objects.create(post=post, author=self.readers[0], text='Ого')
+        comments = self.author.notifications.filter(
+            kind=Notification.COMMENT
+        )
+        self.assertEqual(comments.get().actor, self.readers[0])
+        self.assertEqual(unread_count(self.author), 6)
+
+    def test_inbox_marks_read_and_badge(self):
+        """Значок в шапке гаснет после открытия списка уведомлений."""
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:popular'))
+        self.assertContains(response, '<span class="badge bg-danger">5</span>')
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertEqual(len(response.context['items']), 5)
+        self.assertEqual(unread_count(self.author), 0)
+        self.assertFalse(
+            self.author.notifications.filter(is_read=False).exists()
+        )
+
+    @override_settings(NOTIFICATIONS_ASYNC=True)
+    def test_async_fan_out(self):
+        """Фоновый поток пишет те же уведомления и счётчики."""
+        Post.objects.create(author=self.author, text='Пост')
+        executor().submit(lambda: None).result(timeout=10)
+        self.assertEqual(
+            Notification.objects.filter(kind=Notification.POST).count(), 5
+        )
+        self.assertEqual(
+            sorted(UnreadCounter.objects.values_list('count', flat=True)),
+            [1] * 5 + [5],
+        )
+
+    def test_counter_fixed_after_cascade_deletes(self):
+        """Уведомления удалённых поста и пользователя не висят в счётчике."""
+        reader = self.readers[0]
+        Post.objects.create(author=self.author, text='Пост').delete()
+        self.assertEqual(unread_count(reader), 1)
+        self.client.force_login(reader)
+        self.client.get(reverse('posts:notifications'))
+        self.assertEqual(unread_count(reader), 0)
+
+        self.readers[1].delete()
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertEqual(len(response.context['items']), 4)
+        self.assertEqual(unread_count(self.author), 0)
+
+    def test_no_notification_about_own_post(self):
+        """Подписка на себя и свой пост уведомлений не дают."""
+        Follow.objects.create(user=self.author, author=self.author)
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(
+            self.author.notifications.exclude(
+                actor__in=self.readers
+            ).exists()
+        )
+        self.assertEqual(unread_count(self.author), 5)
@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+# Сколько SQL-запросов может сделать страница. Число не должно зависеть
+# от количества постов, комментариев и подписок в базе. Для вошедшего
+# пользователя один из них - счётчик непрочитанных уведомлений.
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:popular': 5,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 7,
+    'posts:follow_index': 6,
+}
+DATASET_SIZES = (15, 60)
+
+
+def budget_urls():
+    """URL каждой страницы из QUERY_BUDGETS для самых тяжёлых объектов."""
+    group = Group.objects.annotate(
+        posts_count=Count('group_posts')
+    ).order_by('-posts_count').first()
+    author = User.objects.annotate(
+        posts_count=Count('posts')
+    ).order_by('-posts_count').first()
+    post = Post.objects.annotate(
+        comments_count=Count('comments')
+    ).order_by('-comments_count').first()
+    return {
+        'posts:index': reverse('posts:index'),
+        'posts:popular': reverse('posts:popular'),
+        'posts:group_list': reverse('posts:group_list', args=(group.slug,)),
+        'posts:profile': reverse('posts:profile', args=(author.username,)),
+        'posts:post_detail': reverse('posts:post_detail', args=(post.pk,)),
+        'posts:follow_index': reverse('posts:follow_index'),
+    }
+
+
+@override_settings(TRENDING_WINDOW_DAYS=2 * 365)
+class QueryBudgetTests(TestCase):
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_pages_fit_query_budget(self):
+        """Число запросов страницы в бюджете и не растёт вместе с данными."""
+        counts = {}
+        for size in DATASET_SIZES:
+            call_command(
+                'seed', users=size // 3, groups=2,
+                posts=size - Post.objects.count(), comments=size * 2,
+                follows_per_user=5, seed=size, workers=1, stdout=StringIO(),
+            )
+            call_command('update_trending', stdout=StringIO())
+            reader = User.objects.annotate(
+                follows_count=Count('follower')
+            ).order_by('-follows_count').first()
+            client = Client()
+            client.force_login(reader)
+            for name, url in budget_urls().items():
+                counts.setdefault(name, []).append(
+                    self.count_queries(client, url)
+                )
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(page=name):
+                small, large = counts[name]
+                self.assertEqual(
+                    small, large, f'{name}: запросов стало больше с данными'
+                )
+                self.assertLessEqual(large, budget)
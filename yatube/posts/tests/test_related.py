@@ -0,0 +1,52 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, RelatedPost
+from ..related import related_rows
+
+User = get_user_model()
+
+
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=text)
+            for text in (
+                'Котики спят на тёплом диване',
+                'Котик спит на диване весь день',
+                'Рецепт борща со свёклой',
+                'Борщ без свёклы - не борщ',
+                'Погода сегодня',
+            )
+        ]
+
+    def test_related_rows(self):
+        rows = [
+            row for block in related_rows(
+                [post.text for post in self.posts], limit=1, block_size=2
+            )
+            for row in block
+        ]
+        self.assertEqual(
+            [(position, other) for position, other, _ in rows],
+            [(0, 1), (1, 0), (2, 3), (3, 2)],
+        )
+
+    def test_post_detail_shows_related(self):
+        call_command('update_related_posts', stdout=StringIO())
+        self.assertFalse(
+            RelatedPost.objects.filter(post=self.posts[4]).exists()
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.posts[0].pk,))
+        )
+        self.assertEqual(
+            [item.related_post for item in response.context['related']],
+            [self.posts[1]],
+        )
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..search import decode_cursor, match_expression, search_post_ids
+
+User = get_user_model()
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов'
+        )
+        cls.cats = Post.objects.create(
+            author=cls.author, group=cls.group, text='Котики спят на диване'
+        )
+        cls.cat = Post.objects.create(
+            author=cls.other, text='Нашёл котика у подъезда'
+        )
+        cls.hedgehog = Post.objects.create(
+            author=cls.author, text='Ёжик в тумане'
+        )
+
+    def found(self, query, **filters):
+        ids, _ = search_post_ids(query, **filters)
+        return set(ids)
+
+    def test_match_expression(self):
+        self.assertEqual(
+            match_expression('Котиков, ёжики!'), '"котик"* "ежик"*'
+        )
+        self.assertEqual(match_expression(' ,. '), '')
+
+    def test_word_forms_found(self):
+        """Другие падежи и «ё» находят те же посты."""
+        self.assertEqual(
+            self.found('котиков'), {self.cats.pk, self.cat.pk}
+        )
+        self.assertEqual(self.found('ежик'), {self.hedgehog.pk})
+        self.assertEqual(self.found('собаки'), set())
+
+    def test_group_and_author_filters(self):
+        self.assertEqual(self.found('котик', group=self.group), {self.cats.pk})
+        self.assertEqual(self.found('котик', author=self.other), {self.cat.pk})
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.cat.pk)
+        post.text = 'Нашёл щенка у подъезда'
+        post.save()
+        self.assertEqual(self.found('котик'), {self.cats.pk})
+        self.assertEqual(self.found('щенки'), {self.cat.pk})
+        Post.objects.get(pk=self.cats.pk).delete()
+        self.assertEqual(self.found('котик'), set())
+
+    def test_cursor_pagination(self):
+        """Страницы по курсору не пересекаются и покрывают всю выдачу."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Кот номер {number}')
+            for number in range(12)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        first, cursor = search_post_ids('кот', limit=10)
+        second, last_cursor = search_post_ids(
+            'кот', after=decode_cursor(cursor), limit=10
+        )
+        self.assertEqual(len(first), 10)
+        self.assertIsNone(last_cursor)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(len(first) + len(second), 14)
+
+    def test_search_pages(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'котики'})
+        self.assertEqual(
+            {post.pk for post in response.context['posts']},
+            {self.cats.pk, self.cat.pk},
+        )
+        response = self.client.get(
+            reverse('posts:group_search', args=(self.group.slug,)),
+            {'q': 'котики'},
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['posts']], [self.cats.pk]
+        )
+        response = self.client.get(
+            reverse('posts:profile_search', args=(self.other.username,)),
+            {'q': 'котики', 'after': 'испорчен'},
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['posts']], [self.cat.pk]
+        )
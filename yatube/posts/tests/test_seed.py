@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase
+
+from .. import seeding
+from ..models import Comment, Follow, Group, Post, User
+
+
+class SeedCommandTests(TestCase):
+    def test_seed_creates_requested_rows(self):
+        """seed создаёт заданное число строк каждого вида."""
+        output = StringIO()
+        call_command(
+            'seed', users=30, groups=3, posts=100, comments=50,
+            follows_per_user=5, workers=1, stdout=output,
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertIn(
+            f'{Follow._meta.verbose_name_plural}: {Follow.objects.count()}',
+            output.getvalue(),
+        )
+
+    def test_posts_need_users(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'seed', users=0, posts=10, workers=1, stdout=StringIO()
+            )
+        self.assertFalse(Post.objects.exists())
+
+    def test_generation_is_deterministic(self):
+        """Один seed - одни и те же данные."""
+        first = seeding.generate_posts(7, 0, 0, 50, 10, 2, 1000)
+        second = seeding.generate_posts(7, 0, 0, 50, 10, 2, 1000)
+        other = seeding.generate_posts(8, 0, 0, 50, 10, 2, 1000)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_authors_follow_power_law(self):
+        """Первые по популярности авторы получают больше всего постов."""
+        posts = seeding.generate_posts(1, 0, 0, 5000, 1000, 0, 1000)
+        authors = [author for author, _, _, _ in posts]
+        top = sum(author < 10 for author in authors)
+        bottom_half = sum(author >= 500 for author in authors)
+        self.assertGreater(top, bottom_half * 2)
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..management.commands import gc_media
+from ..models import Post
+from ..storage import HashedMediaStorage, is_hashed_name
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class HashedMediaStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляем тестовые медиа."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'posts'), ignore_errors=True
+        )
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые файлы сохраняются в один и тот же путь."""
+        storage = HashedMediaStorage()
+        first = storage.save('posts/a.gif', ContentFile(b'gif'))
+        second = storage.save('posts/b.GIF', ContentFile(b'gif'))
+        self.assertEqual(first, second)
+        self.assertTrue(is_hashed_name(first))
+        self.assertTrue(first.startswith('posts/'))
+        self.assertEqual(len(os.listdir(os.path.dirname(
+            storage.path(first)))), 1)
+
+    def test_files_are_sharded_by_hash_prefix(self):
+        """Файлы раскладываются по каталогам по префиксу хэша."""
+        name = HashedMediaStorage().save('posts/a.gif', ContentFile(b'x'))
+        digest = os.path.splitext(os.path.basename(name))[0]
+        self.assertEqual(
+            name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
+        )
+
+    def test_migrate_command_moves_old_files(self):
+        """Команда переносит старые файлы и обновляет ссылки."""
+        FileSystemStorage().save('posts/old.gif', ContentFile(b'old'))
+        user = User.objects.create_user(username='leo')
+        post = Post.objects.create(
+            author=user, text='Старый пост', image='posts/old.gif'
+        )
+        call_command('migrate_media_to_hashed', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(is_hashed_name(post.image.name))
+        self.assertEqual(post.image.read(), b'old')
+
+    def test_gc_media_removes_only_orphans(self):
+        """Сборщик мусора удаляет только файлы без ссылок из постов."""
+        storage = HashedMediaStorage()
+        kept = storage.save('posts/kept.gif', ContentFile(b'kept'))
+        orphan = storage.save('posts/orphan.gif', ContentFile(b'orphan'))
+        user = User.objects.create_user(username='leo')
+        Post.objects.create(author=user, text='Пост', image=kept)
+        out = StringIO()
+        call_command('gc_media', grace=0, dry_run=True, stdout=out)
+        self.assertIn('Будет удалено файлов: 1', out.getvalue())
+        self.assertTrue(storage.exists(orphan))
+        call_command('gc_media', grace=0, stdout=StringIO())
+        self.assertTrue(storage.exists(kept))
+        self.assertFalse(storage.exists(orphan))
+
+    def test_reused_file_gets_fresh_mtime(self):
+        """Повторное сохранение «омолаживает» файл для сборщика мусора."""
+        storage = HashedMediaStorage()
+        name = storage.save('posts/a.gif', ContentFile(b'gif'))
+        os.utime(storage.path(name), (0, 0))
+        storage.save('posts/b.gif', ContentFile(b'gif'))
+        self.assertGreater(os.stat(storage.path(name)).st_mtime, 0)
+
+    def test_gc_media_rechecks_references_before_removing(self):
+        """Файл, на который сослался пост во время обхода, не удаляется."""
+        storage = HashedMediaStorage()
+        orphan = storage.save('posts/orphan.gif', ContentFile(b'orphan'))
+        user = User.objects.create_user(username='leo')
+
+        def walk_and_reuse(path):
+            Post.objects.create(author=user, text='Пост', image=orphan)
+            yield from walk_files(path)
+
+        walk_files = gc_media.walk_files
+        with mock.patch.object(gc_media, 'walk_files', walk_and_reuse):
+            call_command('gc_media', grace=0, stdout=StringIO())
+        self.assertTrue(storage.exists(orphan))
@@ -0,0 +1,59 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, TrendingPost
+from ..trending import decayed_scores, update_trending
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_WINDOW_DAYS=7, TRENDING_HALF_LIFE=12,
+                   TRENDING_SIZE=2)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.now = timezone.now()
+        cls.posts = {}
+        for name, hours, comments in (
+            ('fresh', 1, 0),
+            ('discussed', 24, 10),
+            ('quiet', 24, 0),
+            ('stale', 24 * 8, 50),
+        ):
+            post = Post.objects.create(author=cls.author, text=name)
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=cls.now - timedelta(hours=hours)
+            )
+            Comment.objects.bulk_create(
+                Comment(post=post, author=cls.author, text='!')
+                for _ in range(comments)
+            )
+            cls.posts[name] = post
+
+    def test_decayed_scores(self):
+        scores = decayed_scores([0, 12, 24], [0, 1, 3], half_life=12)
+        self.assertEqual(list(scores), [1.0, 1.0, 1.0])
+
+    def test_ranking(self):
+        """Обсуждённый пост выше свежего, посты вне окна не попадают."""
+        self.assertEqual(update_trending(self.now), 2)
+        self.assertEqual(
+            list(TrendingPost.objects.values_list('post__text', flat=True)),
+            ['discussed', 'fresh'],
+        )
+
+    def test_popular_page(self):
+        call_command('update_trending', stdout=StringIO())
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(
+            [trending.post for trending in response.context['page_obj']],
+            [self.posts['discussed'], self.posts['fresh']],
+        )
+        self.assertContains(response, 'Популярное')
@@ -109,6 +109,23 @@ class PostViewTests(TestCase):
                 self.assertEqual(page_object.group, object.group)
                 self.assertEqual(page_object.image, object.image)
 
+    def test_post_image_markup(self):
+        """Картинка берёт размеры из поста и грузится лениво с заглушкой."""
+        pages = {
+            reverse('posts:index'): 'lazy',
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): 'eager',
+        }
+        for reverse_page, loading in pages.items():
+            with self.subTest(reverse_page=reverse_page):
+                response = self.authorized_client.get(reverse_page)
+                self.assertContains(response, 'width="960" height="480"')
+                self.assertContains(response, f'loading="{loading}"')
+                self.assertContains(
+                    response,
+                    'style="background: url(data:image/png;base64,',
+                )
+
     def test_groups_page_show_correct_context(self):
         context = {reverse('posts:group_list',
                    kwargs={'slug': self.group.slug}): self.group,
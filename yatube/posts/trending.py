@@ -0,0 +1,65 @@
+"""Популярные посты.
+
+Команда update_trending (по cron) одним запросом берёт id, даты и число
+комментариев постов за последние TRENDING_WINDOW_DAYS дней, считает
+оценку всем постам за один проход по плоским массивам и переписывает
+таблицу TrendingPost лучшими TRENDING_SIZE. Вкладка «Популярное» читает
+только эту таблицу.
+
+Оценка - (комментарии + 1), уменьшающиеся вдвое каждые
+TRENDING_HALF_LIFE часов с публикации: свежий пост без комментариев
+стоит выше старого обсуждённого, пока тот не наберёт вдвое больше
+за каждый период полураспада.
+"""
+import heapq
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Post, TrendingPost
+
+
+def decayed_scores(ages, comments, half_life):
+    """Оценки постов по возрастам в часах и числу комментариев."""
+    return array('d', [
+        (count + 1) * 0.5 ** (age / half_life)
+        for age, count in zip(ages, comments)
+    ])
+
+
+def load_recent(since, now):
+    """Плоские массивы id, возрастов в часах и комментариев постов."""
+    ids, ages, comments = array('q'), array('d'), array('l')
+    rows = Post.objects.filter(pub_date__gte=since).order_by().annotate(
+        comment_count=Count('comments')
+    ).values_list('pk', 'pub_date', 'comment_count')
+    for pk, pub_date, count in rows.iterator():
+        ids.append(pk)
+        ages.append(max((now - pub_date).total_seconds(), 0) / 3600)
+        comments.append(count)
+    return ids, ages, comments
+
+
+def update_trending(now=None):
+    """Пересчитывает список популярных и возвращает его длину."""
+    now = now or timezone.now()
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    ids, ages, comments = load_recent(since, now)
+    scores = decayed_scores(ages, comments, settings.TRENDING_HALF_LIFE)
+    # При равной оценке выше новый пост.
+    top = heapq.nlargest(
+        settings.TRENDING_SIZE, range(len(ids)),
+        key=lambda position: (scores[position], ids[position]),
+    )
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post_id=ids[position], rank=rank,
+                         score=scores[position])
+            for rank, position in enumerate(top, start=1)
+        )
+    return len(top)
@@ -6,8 +6,22 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('popular/', views.popular, name='popular'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('search/', views.search, name='search'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+    path('tags/<str:name>/', views.tag_posts, name='tag'),
+    path('mentions/', views.mentions, name='mentions'),
+    path('notifications/', views.notifications, name='notifications'),
+    path(
+        'group/<slug:slug>/search/', views.search, name='group_search'
+    ),
+    path(
+        'profile/<str:username>/search/',
+        views.search,
+        name='profile_search'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
@@ -1,4 +1,6 @@
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 PAGE_ON_LIST: int = 10
 
@@ -10,3 +12,44 @@ def get_page_context(post_list, request):
     return {
         'page_obj': page_obj,
     }
+
+
+def encode_cursor(item):
+    return f'{item.created.isoformat()}_{item.pk}'
+
+
+def decode_cursor(value):
+    """(created, pk) из параметра after; None, если курсор испорчен."""
+    created, _, pk = value.rpartition('_')
+    try:
+        created = parse_datetime(created)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if created is None:
+        return None
+    return created, pk
+
+
+def get_cursor_page_context(queryset, request, per_page=PAGE_ON_LIST):
+    """Страница по курсору для выборок, упорядоченных по (-created, -pk).
+
+    Курсор - дата и id последней записи страницы, поэтому дальние
+    страницы не дороже первой и не нужен COUNT, как у Paginator.
+    """
+    queryset = queryset.order_by('-created', '-pk')
+    cursor = decode_cursor(request.GET.get('after', ''))
+    if cursor is not None:
+        created, pk = cursor
+        queryset = queryset.filter(
+            Q(created__lt=created) | Q(created=created, pk__lt=pk)
+        )
+    items = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(items[-1])
+    return {
+        'items': items,
+        'next_cursor': next_cursor,
+    }
@@ -1,29 +1,57 @@
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.views.decorators.cache import cache_page
 
+from .autocomplete import USER, autocomplete_index
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
-from .utils import get_page_context
+from .models import (
+    Follow, FollowSuggestion, Group, Mention, Notification, Post, Tag,
+    TagLink, TrendingPost, User,
+)
+from .notifications import mark_read
+from .search import decode_cursor, search_post_ids
+from .utils import get_cursor_page_context, get_page_context
 
 POST_ON_PAGE: int = 10
+AUTOCOMPLETE_LIMIT: int = 10
+SUGGESTIONS_ON_PAGE: int = 5
+RELATED_ON_PAGE: int = 5
+
+
+def follow_suggestions(user):
+    return FollowSuggestion.objects.filter(user=user).select_related(
+        'author'
+    )[:SUGGESTIONS_ON_PAGE]
 
 
 @cache_page(20, key_prefix='index_page')
 def index(request):
-    context = get_page_context(Post.objects.all(), request)
+    context = get_page_context(
+        Post.objects.select_related('author', 'group'), request
+    )
     template = "posts/index.html"
     return render(request, template, context)
 
 
+def popular(request):
+    context = get_page_context(
+        TrendingPost.objects.select_related('post__author', 'post__group'),
+        request
+    )
+    template = 'posts/popular.html'
+    return render(request, template, context)
+
+
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
+    posts = group.group_posts.select_related('author', 'group')
     context = {
         "group": group,
         "posts": posts,
     }
-    context.update(get_page_context(group.group_posts.all(), request))
+    context.update(get_page_context(posts, request))
 
     template = "posts/group_list.html"
 
@@ -39,20 +67,30 @@ def profile(request, username):
         'author': author,
         'following': following,
     }
-    context.update(get_page_context(author.posts.all(), request))
+    if request.user == author:
+        context['suggestions'] = follow_suggestions(author)
+    context.update(get_page_context(
+        author.posts.select_related('author', 'group'), request
+    ))
 
     template = "posts/profile.html"
 
     return render(request, template, context)
 
 
-def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
-    form = CommentForm()
+def post_detail(request, post_id, form=None):
+    """Страница поста; form - отклонённая форма комментария с ошибками."""
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    comments = post.comments.select_related('author')
+    related = post.related.select_related('related_post')[:RELATED_ON_PAGE]
+    if form is None:
+        form = CommentForm()
     context = {
         "post": post,
         'comments': comments,
+        'related': related,
         'form': form,
     }
 
@@ -63,14 +101,16 @@ def post_detail(request, post_id):
 
 @login_required
 def post_create(request):
-    if request.method == "POST":
-        form = PostForm(request.POST)
-        if form.is_valid():
-            post = form.save(commit=False)
-            post.author = request.user
-            post.save()
-            return redirect(f"/profile/{post.author}/", {"form": form})
-    form = PostForm()
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        user=request.user
+    )
+    if request.method == "POST" and form.is_valid():
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        return redirect(f"/profile/{post.author}/", {"form": form})
     groups = Group.objects.all()
     template = "posts/create_post.html"
     context = {"form": form, "groups": groups}
@@ -85,11 +125,12 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        user=request.user
     )
     template = "posts/create_post.html"
     if request.user == author:
-        if request.method == "POST" and form.is_valid:
+        if request.method == "POST" and form.is_valid():
             post = form.save()
             return redirect("posts:post_detail", post_id)
         context = {
@@ -105,11 +146,14 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
-    if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = get_object_or_404(Post, pk=post_id)
-        comment.save()
+    if not form.is_valid():
+        if request.method == 'POST':
+            return post_detail(request, post_id, form)
+        return redirect('posts:post_detail', post_id=post_id)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = get_object_or_404(Post, pk=post_id)
+    comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -117,8 +161,12 @@ def add_comment(request, post_id):
 def follow_index(request):
     template = 'posts/follow.html'
     context = get_page_context(
-        Post.objects.filter(author__following__user=request.user), request
+        Post.objects.filter(
+            author__following__user=request.user
+        ).select_related('author', 'group'),
+        request
     )
+    context['suggestions'] = follow_suggestions(request.user)
     return render(request, template, context)
 
 
@@ -142,3 +190,81 @@ def profile_unfollow(request, username):
     if data_follow.exists():
         data_follow.delete()
     return redirect('posts:profile', username)
+
+
+def search(request, slug=None, username=None):
+    group = get_object_or_404(Group, slug=slug) if slug else None
+    author = get_object_or_404(User, username=username) if username else None
+    query = request.GET.get('q', '').strip()
+    after = None
+    if request.GET.get('after'):
+        try:
+            after = decode_cursor(request.GET['after'])
+        except ValueError:
+            after = None
+    posts, next_cursor = [], None
+    if query:
+        ids, next_cursor = search_post_ids(
+            query, group=group, author=author, after=after,
+            limit=POST_ON_PAGE,
+        )
+        found = Post.objects.select_related('author', 'group').in_bulk(ids)
+        posts = [found[pk] for pk in ids if pk in found]
+    context = {
+        'query': query,
+        'group': group,
+        'author': author,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    template = 'posts/search.html'
+    return render(request, template, context)
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.casefold())
+    links = TagLink.objects.filter(tag=tag).select_related(
+        'post__author', 'post__group', 'comment__author'
+    )
+    context = {'tag': tag}
+    context.update(get_cursor_page_context(links, request))
+    template = 'posts/tag_posts.html'
+    return render(request, template, context)
+
+
+@login_required
+def mentions(request):
+    links = Mention.objects.filter(user=request.user).select_related(
+        'post__author', 'post__group', 'comment__author'
+    )
+    context = get_cursor_page_context(links, request)
+    template = 'posts/mentions.html'
+    return render(request, template, context)
+
+
+@login_required
+def notifications(request):
+    context = get_cursor_page_context(
+        Notification.objects.filter(recipient=request.user).select_related(
+            'actor', 'post', 'comment'
+        ),
+        request
+    )
+    mark_read(request.user)
+    template = 'posts/notifications.html'
+    return render(request, template, context)
+
+
+def autocomplete(request):
+    results = []
+    found = autocomplete_index.search(
+        request.GET.get('q', ''), AUTOCOMPLETE_LIMIT
+    )
+    for kind, label, slug in found:
+        url_name = 'posts:profile' if kind == USER else 'posts:group_list'
+        results.append({
+            'type': kind,
+            'label': label,
+            'url': reverse(url_name, args=(slug,)),
+        })
+    return JsonResponse({'results': results})
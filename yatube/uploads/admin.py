@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Upload
+
+
+class UploadAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'filename',
+        'size',
+        'offset',
+        'status',
+        'created',
+    )
+    list_filter = ('status',)
+
+
+admin.site.register(Upload, UploadAdmin)
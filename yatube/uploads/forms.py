@@ -0,0 +1,29 @@
+import re
+
+from django import forms
+from django.conf import settings
+from django.forms import ModelForm
+
+from .models import Upload
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadForm(ModelForm):
+    class Meta:
+        model = Upload
+        fields = ('filename', 'size', 'sha256')
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        if size > settings.UPLOAD_MAX_SIZE:
+            raise forms.ValidationError(
+                f'Файл больше {settings.UPLOAD_MAX_SIZE} байт'
+            )
+        return size
+
+    def clean_sha256(self):
+        sha256 = self.cleaned_data['sha256'].lower()
+        if not SHA256_RE.match(sha256):
+            raise forms.ValidationError('Неверный формат SHA-256')
+        return sha256
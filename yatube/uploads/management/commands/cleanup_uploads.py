@@ -0,0 +1,90 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from uploads.models import Upload
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def staging_files():
+    try:
+        entries = os.scandir(settings.UPLOADS_STAGING_ROOT)
+    except FileNotFoundError:
+        return
+    with entries:
+        yield from entries
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет брошенные загрузки: строки Upload и части в '
+        'UPLOADS_STAGING_ROOT, в которые не писали дольше '
+        'UPLOAD_EXPIRE_AFTER секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что будет удалено.',
+        )
+
+    def handle(self, *args, **options):
+        deadline = time.time() - settings.UPLOAD_EXPIRE_AFTER
+        expired = self.remove_expired(deadline, options['dry_run'])
+        orphans = self.remove_orphans(deadline, options['dry_run'])
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} загрузок: {expired}, файлов без загрузки: {orphans}'
+        )
+
+    def remove_expired(self, deadline, dry_run):
+        created_before = timezone.now() - timedelta(
+            seconds=settings.UPLOAD_EXPIRE_AFTER
+        )
+        expired = 0
+        uploads = Upload.objects.filter(created__lt=created_before)
+        for upload in uploads.iterator():
+            path = upload.staging_path
+            # Медленную загрузку, которую ещё докачивают, не трогаем:
+            # время последней части - mtime файла.
+            try:
+                if os.stat(path).st_mtime > deadline:
+                    continue
+            except FileNotFoundError:
+                pass
+            if not dry_run:
+                upload.delete()
+                remove(path)
+            expired += 1
+        return expired
+
+    def remove_orphans(self, deadline, dry_run):
+        """Части без строки Upload, например после сбоя между удалением
+        строки и файла."""
+        known = {
+            pk.hex for pk in Upload.objects.values_list('pk', flat=True)
+        }
+        orphans = 0
+        for entry in staging_files():
+            name, ext = os.path.splitext(entry.name)
+            if ext != '.part' or name in known:
+                continue
+            try:
+                if entry.stat().st_mtime > deadline:
+                    continue
+            except FileNotFoundError:
+                continue
+            if not dry_run:
+                remove(entry.path)
+            orphans += 1
+        return orphans
@@ -0,0 +1,55 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class Upload(models.Model):
+    """Файл, загружаемый по частям.
+
+    Части дописываются во временный файл в UPLOADS_STAGING_ROOT,
+    offset хранит, сколько байт уже принято, - с него клиент
+    продолжает загрузку после обрыва соединения.
+    """
+    PENDING = 'pending'
+    COMPLETE = 'complete'
+    STATUS_CHOICES = (
+        (PENDING, 'Загружается'),
+        (COMPLETE, 'Загружен'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='uploads',
+        verbose_name='Пользователь',
+    )
+    filename = models.CharField('Имя файла', max_length=255)
+    size = models.PositiveIntegerField('Размер')
+    sha256 = models.CharField('SHA-256', max_length=64)
+    offset = models.PositiveIntegerField('Принято байт', default=0)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Загрузка'
+        verbose_name_plural = 'Загрузки'
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def staging_path(self):
+        return os.path.join(
+            settings.UPLOADS_STAGING_ROOT, f'{self.pk.hex}.part'
+        )
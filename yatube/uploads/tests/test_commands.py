@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Upload
+
+User = get_user_model()
+
+TEMP_STAGING_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(UPLOADS_STAGING_ROOT=TEMP_STAGING_ROOT)
+class CleanupUploadsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+
+    def setUp(self):
+        os.makedirs(TEMP_STAGING_ROOT, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_STAGING_ROOT, ignore_errors=True)
+
+    def make_upload(self, age, status=Upload.PENDING):
+        """Загрузка, созданная и дописанная age секунд назад."""
+        upload = Upload.objects.create(
+            user=self.user, filename='small.gif', size=10, sha256='',
+            status=status,
+        )
+        Upload.objects.filter(pk=upload.pk).update(
+            created=timezone.now() - timedelta(seconds=age)
+        )
+        self.touch(upload.staging_path, age)
+        return upload
+
+    def touch(self, path, age):
+        open(path, 'wb').close()
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def test_expired_uploads_are_removed(self):
+        """Брошенные загрузки удаляются вместе с файлами."""
+        old = settings.UPLOAD_EXPIRE_AFTER + 60
+        abandoned = self.make_upload(old)
+        unused = self.make_upload(old, status=Upload.COMPLETE)
+        fresh = self.make_upload(0)
+        # Старая загрузка, в которую только что дописали часть.
+        slow = self.make_upload(old)
+        self.touch(slow.staging_path, 0)
+        orphan = os.path.join(TEMP_STAGING_ROOT, 'f' * 32 + '.part')
+        self.touch(orphan, old)
+        output = StringIO()
+        call_command('cleanup_uploads', stdout=output)
+        self.assertIn('загрузок: 2, файлов без загрузки: 1', output.getvalue())
+        self.assertQuerysetEqual(
+            Upload.objects.order_by('created'),
+            [slow.pk, fresh.pk],
+            transform=lambda upload: upload.pk,
+        )
+        for upload in (abandoned, unused):
+            self.assertFalse(os.path.exists(upload.staging_path))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(fresh.staging_path))
+
+    def test_dry_run_keeps_everything(self):
+        self.make_upload(settings.UPLOAD_EXPIRE_AFTER + 60)
+        output = StringIO()
+        call_command('cleanup_uploads', dry_run=True, stdout=output)
+        self.assertIn('Будет удалено загрузок: 1', output.getvalue())
+        self.assertEqual(Upload.objects.count(), 1)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..models import Upload
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def png_chunk(kind, data):
+    crc = zlib.crc32(kind + data)
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', crc)
+
+
+# Заголовок PNG 20000x20000: Pillow отказывается его открывать.
+BOMB_PNG = (
+    b'\x89PNG\r\n\x1a\n'
+    + png_chunk(b'IHDR', struct.pack('>IIBBBBB', 20000, 20000, 8, 0, 0, 0, 0))
+    + png_chunk(b'IEND', b'')
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    UPLOADS_STAGING_ROOT=TEMP_MEDIA_ROOT + '/staging',
+    UPLOAD_CHUNK_SIZE=16,
+)
+class UploadViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляем тестовые медиа."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def start_upload(self, content, filename='small.gif'):
+        response = self.authorized_client.post(
+            reverse('uploads:upload_create'),
+            {
+                'filename': filename,
+                'size': len(content),
+                'sha256': hashlib.sha256(content).hexdigest(),
+            },
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        return response.json()['id']
+
+    def send_chunk(self, upload_id, offset, chunk):
+        return self.authorized_client.put(
+            reverse('uploads:upload_detail', args=(upload_id,)),
+            data=chunk,
+            content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunked_upload_is_attached_to_post(self):
+        """Загрузка по частям собирается и прикрепляется к посту."""
+        upload_id = self.start_upload(SMALL_GIF)
+        for offset in range(0, len(SMALL_GIF), 16):
+            response = self.send_chunk(
+                upload_id, offset, SMALL_GIF[offset:offset + 16]
+            )
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.authorized_client.post(
+            reverse('uploads:upload_complete', args=(upload_id,))
+        )
+        self.assertEqual(response.json()['status'], Upload.COMPLETE)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'upload': upload_id},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(post.image.read(), SMALL_GIF)
+        self.assertFalse(Upload.objects.filter(pk=upload_id).exists())
+
+    def complete_upload(self, content, filename):
+        upload_id = self.start_upload(content, filename)
+        for offset in range(0, len(content), 16):
+            self.send_chunk(upload_id, offset, content[offset:offset + 16])
+        self.authorized_client.post(
+            reverse('uploads:upload_complete', args=(upload_id,))
+        )
+        return upload_id
+
+    def test_extension_comes_from_image_format(self):
+        """Расширение файла берётся из формата картинки, а не из имени."""
+        upload_id = self.complete_upload(SMALL_GIF, 'small.html')
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'upload': upload_id},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(os.path.splitext(post.image.name)[1], '.gif')
+
+    def test_not_image_upload_is_rejected(self):
+        """HTML и картинка-бомба не прикрепляются к посту."""
+        files = {
+            'x.html': b'<html><script>alert(1)</script></html>',
+            'bomb.png': BOMB_PNG,
+        }
+        for filename, content in files.items():
+            with self.subTest(filename=filename):
+                upload_id = self.complete_upload(content, filename)
+                response = self.authorized_client.post(
+                    reverse('posts:post_create'),
+                    {'text': 'Пост', 'upload': upload_id},
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response.context['form'].errors)
+                self.assertFalse(Post.objects.filter(text='Пост').exists())
+
+    def test_out_of_order_chunk_returns_current_offset(self):
+        """Часть не с того места отклоняется, ответ говорит, где продолжить."""
+        upload_id = self.start_upload(SMALL_GIF)
+        self.send_chunk(upload_id, 0, SMALL_GIF[:16])
+        response = self.send_chunk(upload_id, 32, SMALL_GIF[32:])
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        self.assertEqual(response.json()['offset'], 16)
+
+    def test_hash_mismatch_restarts_upload(self):
+        """При несовпадении хэша загрузка начинается заново."""
+        upload_id = self.start_upload(SMALL_GIF)
+        broken = b'\x00' * len(SMALL_GIF)
+        for offset in range(0, len(broken), 16):
+            self.send_chunk(upload_id, offset, broken[offset:offset + 16])
+        response = self.authorized_client.post(
+            reverse('uploads:upload_complete', args=(upload_id,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(Upload.objects.get(pk=upload_id).offset, 0)
@@ -0,0 +1,107 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods, require_POST
+
+from .forms import UploadForm
+from .models import Upload
+
+READ_BLOCK_SIZE: int = 64 * 1024
+
+
+def upload_state(upload):
+    return {
+        'id': str(upload.pk),
+        'offset': upload.offset,
+        'size': upload.size,
+        'status': upload.status,
+        'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+    }
+
+
+@login_required
+@require_POST
+def upload_create(request):
+    form = UploadForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    upload = form.save(commit=False)
+    upload.user = request.user
+    upload.save()
+    os.makedirs(settings.UPLOADS_STAGING_ROOT, exist_ok=True)
+    open(upload.staging_path, 'wb').close()
+    return JsonResponse(upload_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def upload_detail(request, upload_id):
+    """GET - узнать, с какого байта продолжать, PUT - принять часть.
+
+    Часть передаётся телом запроса, её начало - в заголовке Upload-Offset.
+    Часть, пришедшая не с текущего offset, отклоняется с 409, и клиент
+    продолжает с offset из ответа.
+    """
+    upload = get_object_or_404(Upload, pk=upload_id, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(upload_state(upload))
+    if upload.status != Upload.PENDING:
+        return JsonResponse(upload_state(upload), status=409)
+    try:
+        start = int(request.META['HTTP_UPLOAD_OFFSET'])
+        length = int(request.META['CONTENT_LENGTH'])
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'Нужны заголовки Upload-Offset и Content-Length'},
+            status=400,
+        )
+    if start != upload.offset:
+        return JsonResponse(upload_state(upload), status=409)
+    if length > settings.UPLOAD_CHUNK_SIZE or start + length > upload.size:
+        return JsonResponse({'error': 'Слишком большая часть'}, status=400)
+    with open(upload.staging_path, 'r+b') as staging:
+        staging.seek(start)
+        remaining = length
+        while remaining:
+            block = request.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            staging.write(block)
+            remaining -= len(block)
+    received = length - remaining
+    # Условное обновление: из двух одновременных запросов с одной частью
+    # засчитывается только один.
+    updated = Upload.objects.filter(pk=upload.pk, offset=start).update(
+        offset=start + received
+    )
+    upload.refresh_from_db()
+    return JsonResponse(upload_state(upload), status=200 if updated else 409)
+
+
+@login_required
+@require_POST
+def upload_complete(request, upload_id):
+    upload = get_object_or_404(Upload, pk=upload_id, user=request.user)
+    if upload.status == Upload.COMPLETE:
+        return JsonResponse(upload_state(upload))
+    if upload.offset != upload.size:
+        return JsonResponse(upload_state(upload), status=409)
+    digest = hashlib.sha256()
+    with open(upload.staging_path, 'rb') as staging:
+        for block in iter(lambda: staging.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    if digest.hexdigest() != upload.sha256:
+        # Содержимое испорчено - начинаем загрузку заново.
+        open(upload.staging_path, 'wb').close()
+        upload.offset = 0
+        upload.save(update_fields=('offset',))
+        return JsonResponse(
+            dict(upload_state(upload), error='Хэш не совпадает'), status=400
+        )
+    upload.status = Upload.COMPLETE
+    upload.save(update_fields=('status',))
+    return JsonResponse(upload_state(upload))
@@ -46,12 +46,19 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'uploads.apps.UploadsConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.accesslog.AccessLogMiddleware',
+    'core.profiler.ProfilerMiddleware',
+    'core.memory.MemoryProfileMiddleware',
+    'core.nplusone.NPlusOneMiddleware',
+    'core.slowlog.SlowQueryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,6 +66,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.tracing.TracingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -66,7 +74,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.MeteredDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,6 +84,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.unread_notifications',
             ],
         },
     },
@@ -83,6 +92,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'core.metrics.MeteredLocMemCache',
+    }
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -149,7 +164,142 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# кто отдаёт медиафайлы: None - само приложение, 'x-accel-redirect' - nginx
+# (internal location по MEDIA_ACCEL_REDIRECT_PREFIX), 'x-sendfile' - Apache
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# недокачанные части картинок, загружаемых через uploads; загрузки, в
+# которые не писали UPLOAD_EXPIRE_AFTER секунд, удаляет cleanup_uploads
+UPLOADS_STAGING_ROOT = os.path.join(BASE_DIR, 'uploads_staging')
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+UPLOAD_EXPIRE_AFTER = 24 * 60 * 60
+# доля запросов, в которых ищутся N+1: одинаковые SELECT с разными
+# параметрами, выполненные NPLUSONE_THRESHOLD раз и больше
+NPLUSONE_SAMPLE_RATE = 0.01
+NPLUSONE_THRESHOLD = 5
+# картинки, pHash которых отличается не больше чем на столько бит, считаются
+# одинаковыми; такие посты отмечаются, а при POSTS_REJECT_DUPLICATE_IMAGES
+# не принимаются
+POSTS_IMAGE_DUPLICATE_DISTANCE = 4
+POSTS_REJECT_DUPLICATE_IMAGES = False
+# индекс pHash перестраивается из базы раз в столько секунд, чтобы увидеть
+# картинки, загруженные через другие процессы
+POSTS_IMAGE_HASH_REFRESH_INTERVAL = 300
+# индекс автодополнения перестраивается из базы раз в столько секунд, чтобы
+# увидеть пользователей и группы, созданные в других процессах
+AUTOCOMPLETE_REFRESH_INTERVAL = 300
+# популярное: update_trending берёт посты за последние TRENDING_WINDOW_DAYS
+# дней, вес комментария падает вдвое каждые TRENDING_HALF_LIFE часов,
+# в списке остаются TRENDING_SIZE лучших
+TRENDING_WINDOW_DAYS = 7
+TRENDING_HALF_LIFE = 12
+TRENDING_SIZE = 100
+# посты и комментарии, похожие (по оценке MinHash, от 0 до 1) на текст не
+# старше NEAR_DUPLICATE_WINDOW секунд хотя бы на NEAR_DUPLICATE_THRESHOLD, не
+# принимаются; тексты короче NEAR_DUPLICATE_MIN_LENGTH символов не проверяются
+NEAR_DUPLICATE_WINDOW = 24 * 60 * 60
+NEAR_DUPLICATE_THRESHOLD = 0.8
+NEAR_DUPLICATE_MIN_LENGTH = 50
+# уведомления рассылает фоновый поток пачками по NOTIFICATIONS_BATCH_SIZE;
+# при NOTIFICATIONS_ASYNC = False - сразу после коммита, в потоке запроса
+NOTIFICATIONS_ASYNC = True
+NOTIFICATIONS_BATCH_SIZE = 1000
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# метрики для /metrics: каждый процесс раз в METRICS_FLUSH_INTERVAL секунд
+# пишет свои счётчики в METRICS_DIR, а /metrics складывает файлы всех
+# процессов. /metrics отдаётся только с заголовком
+# Authorization: Bearer <METRICS_TOKEN> (None - выключено; в Prometheus это
+# bearer_token). Файлы старше METRICS_STALE_AFTER секунд - от умерших
+# процессов, они не считаются
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_STALE_AFTER = 60 * 60
+METRICS_TOKEN = None
+
+# профилирование запросов: заголовок X-Profile или параметр ?profile= со
+# значением PROFILER_TOKEN (None - выключено) и каждый
+# PROFILER_SAMPLE_EVERY-й запрос (0 - выключено); свёрнутые стеки пишутся
+# в PROFILER_DIR/<X-Request-ID>.folded
+PROFILER_TOKEN = None
+PROFILER_SAMPLE_EVERY = 0
+PROFILER_INTERVAL = 0.005
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# SQL-запросы дольше SLOW_QUERY_THRESHOLD секунд пишутся в SLOW_QUERY_LOG,
+# отчёт по нему строит команда slow_queries
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
+# доля запросов, для которых tracemalloc меряет пик памяти и места
+# выделения; замеры пишутся в MEMORY_PROFILE_LOG, отчёт - memory_report
+MEMORY_PROFILE_SAMPLE_RATE = 0.0
+MEMORY_PROFILE_FRAMES = 1
+MEMORY_PROFILE_TOP = 10
+MEMORY_PROFILE_LOG = os.path.join(BASE_DIR, 'memory_profile.log')
+# access log в JSON lines пишется фоновым потоком (core.accesslog)
+ACCESS_LOG = os.path.join(BASE_DIR, 'access.log')
+# manage.py test переносит ACCESS_LOG и METRICS_DIR во временный каталог
+TEST_RUNNER = 'core.runner.TempFilesRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+        'memory_profile': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': MEMORY_PROFILE_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+        'access_log': {
+            'class': 'core.accesslog.AsyncBatchHandler',
+            'filename': ACCESS_LOG,
+            'queue_size': 10000,
+            'batch_size': 500,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'core.slowlog': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'core.memory': {
+            'handlers': ['memory_profile'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.accesslog': {
+            'handlers': ['access_log'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# трассировка: доля запросов со спанами view, SQL, шаблонов, кэша и
+# миниатюр; спаны пачками по TRACING_BATCH_SIZE (или раз в
+# TRACING_FLUSH_INTERVAL секунд) дописываются в TRACING_DIR
+TRACING_SAMPLE_RATE = 0.0
+TRACING_BATCH_SIZE = 512
+TRACING_FLUSH_INTERVAL = 5
+TRACING_DIR = os.path.join(BASE_DIR, 'traces')
+THUMBNAIL_BACKEND = 'core.tracing.TracedThumbnailBackend'
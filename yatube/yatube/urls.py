@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.media import serve_media
+from core.metrics import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,6 +11,13 @@ urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
+    path('uploads/', include('uploads.urls', namespace='uploads')),
+    path('metrics', metrics, name='metrics'),
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>',
+        serve_media,
+        name='media'
+    ),
 ]
 
 handler404 = 'core.views.page_not_found'
@@ -17,7 +26,4 @@ handler403 = 'core.views.permission_denied'
 
 if settings.DEBUG:
     import debug_toolbar
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)